@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+import db
+import resolver
+import scheduler
+from time_utils import now
+from benchmarks.fakes import FakeBot, FakeChannel
+
+
+# ─────────────────────────────────────────────────────────────
+# Scheduler Dispatch Benchmark
+# Inserts N reactable announcements due at the same instant and times
+# how long each takes to reach the public channel through
+# send_scheduled_announcements, once per DISPATCH_CONCURRENCY value
+# (1 = the old serial behaviour). Discord is faked with a fixed
+# latency per call. Runs against DATABASE_URL and deletes what it adds.
+#
+#   python -m benchmarks.dispatch --announcements 50 --latency 0.25 --concurrency 1,5,10
+# ─────────────────────────────────────────────────────────────
+async def run_benchmark(args):
+    await db.init_db()
+
+    for concurrency in args.concurrency:
+        scheduler.DISPATCH_CONCURRENCY = concurrency
+        resolver._channels.clear()
+        public_ch = FakeChannel(args.latency, args.fail_rate)
+        bot = FakeBot({
+            scheduler.PUBLIC_CHANNEL_ID: public_ch,
+            scheduler.ADMIN_CHANNEL_ID: FakeChannel(args.latency),
+        })
+
+        ids = [uuid.uuid4() for _ in range(args.announcements)]
+        send_at = now() - timedelta(seconds=1)
+        for aid in ids:
+            await db.execute(
+                """
+                INSERT INTO announcements (id, title, content, content_category, send_at, end_at, state, reactable)
+                VALUES ($1, 'bench', 'bench', 'F', $2, $3, 'scheduled', true)
+                """,
+                (aid, send_at, send_at + timedelta(days=1))
+            )
+
+        try:
+            started = time.perf_counter()
+            sent, failures = await scheduler.send_scheduled_announcements(bot)
+            elapsed = time.perf_counter() - started
+        finally:
+            await db.execute("DELETE FROM announcements WHERE id = ANY($1::uuid[])", (ids,))
+
+        posted = sorted(message.posted_at - started for message in public_ch.sent)
+        p50 = posted[len(posted) // 2] if posted else 0
+        print(
+            f"concurrency {concurrency:>3}: {len(sent)}/{len(ids)} sent in {elapsed:.2f}s, "
+            f"time-to-post p50 {p50:.2f}s, last {posted[-1] if posted else 0:.2f}s, "
+            f"{failures} failed"
+        )
+
+
+def parse_levels(value):
+    return [int(level) for level in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-post for announcements due in the same tick")
+    parser.add_argument("--announcements", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds per faked Discord call")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of public posts that fail")
+    parser.add_argument("--concurrency", type=parse_levels, default=[1, 5, 10], help="comma-separated limits")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import asyncio
+import itertools
+import random
+import time
+from types import SimpleNamespace
+
+_message_ids = itertools.count(10 ** 17)
+
+
+# ─────────────────────────────────────────────────────────────
+# Discord stand-ins for the benchmarks
+# Just enough of a bot, channel and message for the scheduler and
+# dashboard code paths: every call sleeps `latency` seconds, and a
+# `fail_rate` fraction of sends raise like a Discord 503.
+# ─────────────────────────────────────────────────────────────
+class FakeChannel:
+    def __init__(self, latency=0.0, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.sent = []
+        self.attempts = 0
+        self._random = random.Random(seed)
+
+    async def send(self, content=None, embed=None, view=None):
+        self.attempts += 1
+        await asyncio.sleep(self.latency)
+        if self._random.random() < self.fail_rate:
+            raise RuntimeError("503 Service Unavailable")
+
+        message = SimpleNamespace(id=next(_message_ids), posted_at=time.perf_counter())
+        self.sent.append(message)
+        return message
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(self, message_id)
+
+
+class FakeMessage:
+    def __init__(self, channel, message_id):
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        await asyncio.sleep(self.channel.latency)
+
+    async def delete(self):
+        await asyncio.sleep(self.channel.latency)
+
+
+class FakeBot:
+    def __init__(self, channels):
+        self.channels = channels
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        raise LookupError(channel_id)
+
+    def get_guild(self, guild_id):
+        return None
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import re
+import statistics
+import asyncpg
+import db
+
+SCHEMA = "bench_indexes"
+INDEX_MIGRATION = 2  # 002_workload_indexes.sql
+SAMPLE_ANNOUNCEMENT = "(SELECT announcement_id FROM ride_entries ORDER BY announcement_id LIMIT 1)"
+
+# The hot queries as the bot issues them, with the parameters inlined
+QUERIES = {
+    "dashboard.rosters": """
+        SELECT school, role, user_id, seats
+        FROM ride_entries
+        WHERE announcement_id={aid}
+        ORDER BY school, role
+    """,
+    "dashboard.totals": """
+        SELECT school, role, COUNT(*) AS entries, COALESCE(SUM(seats), 0) AS seats
+        FROM ride_entries
+        WHERE announcement_id={aid}
+        GROUP BY school, role
+    """,
+    "export.rows": """
+        SELECT user_id, school, role, seats, phone, info,
+               ROW_NUMBER() OVER (PARTITION BY school, role ORDER BY row_num, updated_at) AS rank
+        FROM ride_entries
+        WHERE announcement_id={aid}
+        ORDER BY rank
+    """,
+    "scheduler.send": """
+        SELECT id, title, content, reactable, end_at, content_category, version
+        FROM announcements
+        WHERE state='scheduled'
+          AND send_at <= NOW()
+    """,
+    "scheduler.close": """
+        UPDATE announcements
+        SET state='closed'
+        WHERE state='sent'
+          AND end_at IS NOT NULL
+          AND end_at <= NOW()
+        RETURNING id, message_id, title, content, reactable
+    """,
+    "scheduler.deadlines": """
+        SELECT send_at, id, false FROM announcements
+        WHERE state='scheduled'
+        UNION ALL
+        SELECT end_at, id, false FROM announcements
+        WHERE state='sent' AND end_at IS NOT NULL
+        UNION ALL
+        (
+            SELECT end_at, id, true FROM announcements
+            WHERE end_at IS NOT NULL
+            ORDER BY end_at
+            LIMIT 1
+        )
+    """,
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# Index Benchmark
+# Builds the schema up to just before the index migration in a
+# scratch schema of DATABASE_URL, seeds --announcements announcements
+# (mostly closed, as after months of use) and --entries ride entries
+# spread over --busy of them, then times the hot queries with
+# EXPLAIN ANALYZE before and after applying the index migration.
+# The data is VACUUM ANALYZEd as autovacuum would, so index-only scans
+# are available. The scratch schema is dropped afterwards.
+#
+#   python -m benchmarks.indexes --entries 100000 --plans
+# ─────────────────────────────────────────────────────────────
+async def seed(conn, args):
+    scheduled = args.announcements // 40
+    sent = args.announcements // 40
+
+    # Scheduled ones send in the future, sent ones close within a day,
+    # closed ones ended in the past
+    await conn.execute(
+        """
+        INSERT INTO announcements (id, title, content, content_category, send_at, end_at, state, reactable)
+        SELECT gen_random_uuid(), 'bench ' || g, 'bench', 'F',
+               NOW() + CASE WHEN g <= $2 THEN g ELSE -g END * INTERVAL '1 hour',
+               NOW() + CASE
+                   WHEN g <= $2 THEN g + 48
+                   WHEN g <= $2 + $3 THEN g % 24 + 1
+                   ELSE 2 - g
+               END * INTERVAL '1 hour',
+               CASE WHEN g <= $2 THEN 'scheduled' WHEN g <= $2 + $3 THEN 'sent' ELSE 'closed' END,
+               true
+        FROM generate_series(1, $1) AS g
+        """,
+        args.announcements, scheduled, sent
+    )
+
+    per_announcement = args.entries // args.busy
+    await conn.execute(
+        """
+        INSERT INTO ride_entries (announcement_id, user_id, school, role, seats, phone, info, row_num, updated_at)
+        SELECT a.id, u,
+               (ARRAY['GT', 'Emory', 'GSU'])[1 + u % 3],
+               CASE WHEN u % 4 = 0 THEN 'driver' ELSE 'rider' END,
+               CASE WHEN u % 4 = 0 THEN 4 END,
+               '9999999999', 'info ' || u, 1 + u / 12,
+               NOW() - u * INTERVAL '1 second'
+        FROM (SELECT id FROM announcements WHERE state <> 'scheduled' ORDER BY id LIMIT $1) AS a,
+             generate_series(1, $2) AS u
+        """,
+        args.busy, per_announcement
+    )
+    await conn.execute("VACUUM ANALYZE")
+
+
+async def measure(conn, runs) -> dict:
+    results = {}
+    for name, query in QUERIES.items():
+        query = query.format(aid=SAMPLE_ANNOUNCEMENT)
+        timings = []
+        for _ in range(runs):
+            # Rolled back so the close UPDATE sees the same rows every run
+            transaction = conn.transaction()
+            await transaction.start()
+            rows = await conn.fetch("EXPLAIN (ANALYZE, BUFFERS) " + query)
+            await transaction.rollback()
+
+            plan = "\n".join(row[0] for row in rows)
+            timings.append(float(re.search(r"Execution Time: ([\d.]+)", plan).group(1)))
+
+        # First runs warm the cache
+        results[name] = (statistics.median(timings[2:]), plan)
+    return results
+
+
+async def run_benchmark(args):
+    conn = await asyncpg.connect(db.DATABASE_URL, server_settings={"search_path": SCHEMA})
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+        await conn.execute(
+            "CREATE TABLE schema_migrations (version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW())"
+        )
+
+        migrations = db._migration_files()
+        for version, filename in migrations:
+            if version < INDEX_MIGRATION:
+                await db._apply_migration(conn, version, filename)
+
+        await seed(conn, args)
+        before = await measure(conn, args.runs)
+
+        for version, filename in migrations:
+            if version == INDEX_MIGRATION:
+                await db._apply_migration(conn, version, filename)
+        await conn.execute("VACUUM ANALYZE")
+        after = await measure(conn, args.runs)
+    finally:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+    print(f"{args.entries} entries over {args.busy} announcements, {args.announcements} announcements")
+    for name in QUERIES:
+        print(f"{name:>20}: {before[name][0]:8.3f}ms -> {after[name][0]:8.3f}ms")
+
+    if args.plans:
+        for name in QUERIES:
+            print(f"\n===== {name} (before)\n{before[name][1]}\n----- {name} (after)\n{after[name][1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the hot queries before and after the index migration")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--busy", type=int, default=100, help="announcements the entries are spread over")
+    parser.add_argument("--announcements", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=7, help="EXPLAIN ANALYZE runs per query; the median is reported")
+    parser.add_argument("--plans", action="store_true", help="print the before/after plans")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+import aiohttp
+from aiohttp import web
+import exporter
+from sheets_standin import StandInSheets
+
+
+# ─────────────────────────────────────────────────────────────
+# Sheets Session Benchmark
+# Per-call latency of Sheets requests made the old way (a new
+# aiohttp.ClientSession, so a new connection, per request) and
+# through the exporter's shared keep-alive session. By default it
+# targets a local Apps Script stand-in, where only the TCP connect is
+# saved. Point --url at a deployed Apps Script to include TLS and DNS.
+#
+#   python -m benchmarks.sheets_session --calls 200
+#   python -m benchmarks.sheets_session --url https://script.google.com/macros/s/.../exec
+# ─────────────────────────────────────────────────────────────
+def payloads(count):
+    aid = str(uuid.uuid4())
+    return [exporter.reset_payload(aid, "F")] + [
+        exporter.add_payload(
+            member=SimpleNamespace(display_name=f"user{i:04d}"),
+            announcement_id=aid,
+            school="GT",
+            role="rider",
+            seats=None,
+            phone="9999999999",
+            info="",
+            count=i + 1,
+            content_category="F",
+        )
+        for i in range(count)
+    ]
+
+
+async def per_request_session(payload):
+    async with aiohttp.ClientSession() as session:
+        async with session.post(exporter.GOOGLE_URL, json=payload, allow_redirects=True) as resp:
+            await resp.text()
+
+
+async def shared_session(payload):
+    await exporter.post_to_sheets(payload)
+
+
+async def run_benchmark(args):
+    runner = None
+    if args.url:
+        exporter.GOOGLE_URL = args.url
+    else:
+        runner = web.AppRunner(StandInSheets().make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        exporter.GOOGLE_URL = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/exec"
+
+    try:
+        for name, post in (("new session per request", per_request_session), ("shared session", shared_session)):
+            latencies = []
+            for payload in payloads(args.calls):
+                started = time.perf_counter()
+                await post(payload)
+                latencies.append(time.perf_counter() - started)
+
+            # The reset warms the connection in the shared case
+            latencies = sorted(latencies[1:])
+            print(
+                f"{name:>24}: avg {sum(latencies) / len(latencies) * 1000:.2f}ms, "
+                f"p50 {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.2f}ms"
+            )
+    finally:
+        await exporter.close_session()
+        if runner:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sheets request latency: per-request vs shared HTTP session")
+    parser.add_argument("--calls", type=int, default=200, help="sequential requests per mode")
+    parser.add_argument("--url", help="Apps Script URL; defaults to a local stand-in")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from types import SimpleNamespace
+import db
+import views
+from sheets_standin import StandInSheets, SHEET_NAMES, cell_placement
+from exporter import add_payload
+
+USER_ID_BASE = 9_000_000_000_000  # fake user ids, well below real snowflakes; deleted afterwards
+SCHOOLS = ["GT", "Emory", "GSU"]
+
+
+# ─────────────────────────────────────────────────────────────
+# Signup Stress Test
+# Submits --signups concurrent signups to one announcement, then
+# withdraws --churn of them while as many new users sign up at the
+# same time, so freed rows are reused under contention. Checks that:
+# - no two entries share a (school, role, row_num)
+# - every list's rows 1..last_row are either taken or free, never both
+# - replaying sheet_outbox in delivery order (through the Apps Script
+#   stand-in) leaves exactly the database's entries on the sheet
+# Each signup is the button click's state lookup plus the modal submit,
+# and the database round trips per signup are reported from query_stats().
+# Runs against DATABASE_URL and deletes what it adds.
+#
+#   python -m benchmarks.signups --signups 600 --churn 150
+# ─────────────────────────────────────────────────────────────
+def member(i):
+    return SimpleNamespace(id=USER_ID_BASE + i, display_name=f"user{i:04d}")
+
+
+async def signup(aid, i):
+    school = SCHOOLS[i % len(SCHOOLS)]
+    driver = i % 4 == 0
+    await views.load_signup_state(aid, USER_ID_BASE + i)
+    await views.register_entry(
+        aid, member(i), school, "driver" if driver else "rider", 4 if driver else None, "9999999999", ""
+    )
+
+
+async def run_benchmark(args):
+    await db.init_db()
+
+    aid = uuid.uuid4()
+    await db.execute(
+        """
+        INSERT INTO announcements (id, title, content, content_category, send_at, end_at, state, reactable)
+        VALUES ($1, 'bench', 'bench', 'F', NOW(), NOW() + INTERVAL '1 day', 'sent', true)
+        """,
+        (aid,)
+    )
+
+    try:
+        calls = total_calls()
+        started = time.perf_counter()
+        await asyncio.gather(*(signup(aid, i) for i in range(args.signups)))
+        elapsed = time.perf_counter() - started
+        round_trips = (total_calls() - calls) / args.signups
+        print(
+            f"{args.signups} concurrent signups in {elapsed:.2f}s ({args.signups / elapsed:.0f}/s), "
+            f"{round_trips:.2f} database round trips per signup"
+        )
+
+        leaving = random.Random(0).sample(range(args.signups), args.churn)
+        joining = range(args.signups, args.signups + args.churn)
+        work = [views.withdraw_entry(aid, member(i)) for i in leaving] + [signup(aid, i) for i in joining]
+        random.Random(1).shuffle(work)
+
+        started = time.perf_counter()
+        await asyncio.gather(*work)
+        elapsed = time.perf_counter() - started
+        print(f"{args.churn} withdrawals + {args.churn} signups interleaved in {elapsed:.2f}s")
+
+        failures = await check(aid)
+    finally:
+        await db.execute("DELETE FROM announcements WHERE id=$1", (aid,))
+        await db.execute(
+            "DELETE FROM saved_info WHERE user_id >= $1 AND user_id < $2",
+            (USER_ID_BASE, USER_ID_BASE + args.signups + args.churn)
+        )
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("all checks passed" if not failures else f"{len(failures)} checks failed")
+
+
+def total_calls() -> int:
+    return sum(stats["calls"] for stats in db.query_stats().values())
+
+
+async def check(aid) -> list:
+    failures = []
+
+    entries = await db.fetchall(
+        "SELECT user_id, school, role, seats, phone, info, row_num FROM ride_entries WHERE announcement_id=$1",
+        (aid,)
+    )
+    taken = defaultdict(list)
+    for entry in entries:
+        taken[(entry["school"], entry["role"])].append(entry["row_num"])
+
+    for key, rows in taken.items():
+        if len(rows) != len(set(rows)):
+            failures.append(f"{key}: duplicate rows handed out")
+
+    counters = await db.fetchall(
+        "SELECT school, role, last_row FROM ride_row_counters WHERE announcement_id=$1", (aid,)
+    )
+    free = defaultdict(set)
+    for row in await db.fetchall(
+        "SELECT school, role, row_num FROM ride_free_rows WHERE announcement_id=$1", (aid,)
+    ):
+        free[(row["school"], row["role"])].add(row["row_num"])
+
+    for counter in counters:
+        key = (counter["school"], counter["role"])
+        used = set(taken[key])
+        if used & free[key]:
+            failures.append(f"{key}: rows both taken and free")
+        if used | free[key] != set(range(1, counter["last_row"] + 1)):
+            failures.append(f"{key}: rows 1..{counter['last_row']} not all accounted for")
+
+    # Replays the outbox in the order the worker would deliver it
+    sheets = StandInSheets()
+    sheets.apply({"action": "reset", "announcement_id": str(aid), "content_category": "F"})
+    for op in await db.fetchall(
+        "SELECT payload FROM sheet_outbox WHERE announcement_id=$1 ORDER BY id", (aid,)
+    ):
+        sheets.apply(json.loads(op["payload"]))
+
+    expected = {}
+    for entry in entries:
+        i = entry["user_id"] - USER_ID_BASE
+        payload = add_payload(
+            member(i), aid, entry["school"], entry["role"], entry["seats"],
+            entry["phone"], entry["info"], entry["row_num"], "F"
+        )
+        row, col, values = cell_placement(payload)
+        for offset, value in enumerate(values):
+            if value != "":
+                expected[(row, col + offset)] = value
+
+    if sheets.grids[SHEET_NAMES["F"]] != expected:
+        failures.append("replayed sheet does not match the database")
+
+    print(
+        f"{len(entries)} entries, {sum(len(rows) for rows in free.values())} free rows, "
+        f"{len(expected)} sheet cells expected"
+    )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent signup/withdraw stress test for the row allocator")
+    parser.add_argument("--signups", type=int, default=600)
+    parser.add_argument("--churn", type=int, default=150, help="withdrawals (and new signups) during the second phase")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+import asyncpg
+import discord
+from discord.ext import commands
+import db
+from time_utils import now
+from views import RideButton
+from dashboard_paginator import DashboardButton
+
+
+# ─────────────────────────────────────────────────────────────
+# Startup Benchmark
+# Times the database and view setup that bot.on_ready does (init_db,
+# then registering the RideButton / DashboardButton templates) with
+# growing numbers of closed reactable announcements (with dashboards) in the
+# database. Command sync and the gateway login are left out; they do
+# not depend on history. Runs against DATABASE_URL and deletes what
+# it adds.
+#
+#   python -m benchmarks.startup --history 0,1000,10000
+# ─────────────────────────────────────────────────────────────
+async def startup():
+    await db.init_db()
+
+    intents = discord.Intents.default()
+    intents.members = True
+    bot = commands.Bot(command_prefix="!", intents=intents)
+    bot.add_dynamic_items(RideButton, DashboardButton)
+
+
+async def run_benchmark(args):
+    # Seeded over its own connection; every measured startup makes a new pool
+    conn = await asyncpg.connect(db.DATABASE_URL)
+    ids = []
+
+    try:
+        for history in sorted(args.history):
+            added = [uuid.uuid4() for _ in range(history - len(ids))]
+            ended = now() - timedelta(days=1)
+            await conn.execute(
+                """
+                INSERT INTO announcements (id, title, content, content_category, send_at, end_at, state, reactable,
+                                           message_id, dashboard_message_id)
+                SELECT id, 'bench', 'bench', 'F', $2, $2, 'closed', true, 1, 1
+                FROM UNNEST($1::uuid[]) AS id
+                """,
+                added, ended
+            )
+            ids += added
+
+            timings = []
+            peak = 0
+            for _ in range(args.runs):
+                tracemalloc.start()
+                started = time.perf_counter()
+                await startup()
+                timings.append(time.perf_counter() - started)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                await db._pool.close()
+
+            print(
+                f"{history:>7} announcements: startup {min(timings) * 1000:.1f}ms (best of {args.runs}), "
+                f"peak memory {peak / 1024:.0f} KiB"
+            )
+    finally:
+        await conn.execute("DELETE FROM announcements WHERE id = ANY($1::uuid[])", ids)
+        await conn.close()
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and memory as announcement history grows")
+    parser.add_argument("--history", type=parse_sizes, default=[0, 1000, 10000], help="comma-separated sizes")
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
 import os
 import uuid
 import discord
+from typing import Literal
 from discord import app_commands
 from discord.ext import commands
-from db import init_db, execute, fetchall, fetchone
+from db import init_db, execute, fetchall, fetchone, query_stats, pool_stats
 from time_utils import parse_to_utc_iso, fmt_time
-from views import AnnouncementContentModal, AnnouncementEditModal, RideView
-from dashboard import render_dashboard
-from dashboard_paginator import DashboardPaginator
-from scheduler import scheduler_loop, delete_announcement
+from views import AnnouncementContentModal, AnnouncementEditModal, RideButton
+from dashboard_paginator import DashboardButton
+from dashboard import refresh_stats
+from dashboard_snapshot import snapshot_cache_stats
+from scheduler import scheduler_loop, delete_announcement, DeadlineQueue
+from members import remember_member, forget_member, member_cache_stats
+from resolver import resolver_stats
+from exporter import close_session, build_export, sheets_latency_stats, breaker_stats, export_cache_stats
+from outbox import outbox_loop, outbox_stats
+from reconcile import reconcile_loop, reconcile_announcement, reconcile_stats
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -19,25 +26,25 @@ ALLOWED_ROLE_ID = int(os.getenv("ALLOWED_ROLE_ID"))
 intents = discord.Intents.default()
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Closes shared resources (the Sheets HTTP session) on shutdown
+class JourneyBot(commands.Bot):
+    async def close(self):
+        await close_session()
+        await super().close()
+
+
+bot = JourneyBot(command_prefix="!", intents=intents)
 bot.setup = False
+bot.deadlines = DeadlineQueue()
 
 @bot.event
 async def on_ready():
     if not bot.setup:
         await init_db()
 
-        # Restoring views for sent and closed announcements for persistence
-        rows = await fetchall(
-            "SELECT id, state, title, end_at, dashboard_page, reactable FROM announcements WHERE state IN ('sent', 'closed')"
-        )
-
-        for aid, state, title, end_at, page, reactable in rows:
-            if reactable:
-                bot.add_view(RideView(aid, is_closed=(state == "closed")))
-                embeds = await render_dashboard(bot, aid, title, end_at)
-                if embeds:
-                    bot.add_view(DashboardPaginator(embeds, aid, title, start_index=page))
+        # Persistent buttons are resolved from their custom id at click time,
+        # so no per-announcement work is needed here
+        bot.add_dynamic_items(RideButton, DashboardButton)
 
         # Sync commands
         guild = discord.Object(id=int(os.getenv("SERVER_ID")))
@@ -46,11 +53,36 @@ async def on_ready():
         
         # Start scheduler loop
         bot.loop.create_task(scheduler_loop(bot))
+
+        # Start Google Sheets outbox worker
+        bot.loop.create_task(outbox_loop(bot))
+
+        # Start periodic Google Sheets reconciliation
+        bot.loop.create_task(reconcile_loop(bot))
         bot.setup = True
     else:
         print("Bot is already set up and ready.")
 
 
+# ─────────────────────────────────────────────────────────────
+# Keeps the member display-name cache fresh
+# ─────────────────────────────────────────────────────────────
+@bot.event
+async def on_member_update(before, after):
+    remember_member(after)
+
+
+@bot.event
+async def on_member_remove(member):
+    forget_member(member.id)
+
+
+# Global name changes arrive as a User; drop the entry so it is re-fetched
+@bot.event
+async def on_user_update(before, after):
+    forget_member(after.id)
+
+
 # ─────────────────────────────────────────────────────────────
 # Creates a scheduled announcement
 # Format time like 'YYYY-MM-DD HH:MM' in US/Eastern.
@@ -187,6 +219,7 @@ async def announcement_delete(
         interaction.client,
         announcement_id
     )
+    bot.deadlines.wake()
 
     await interaction.response.send_message(
         f"✅ Announcement deleted successfully" if successful else f"❌ Announcement not found.",
@@ -234,6 +267,7 @@ async def announcement_unschedule(
         "DELETE FROM announcements WHERE id=$1",
         (announcement_id,)
     )
+    bot.deadlines.wake()
 
     await interaction.response.send_message(
         "✅ Announcement unscheduled.",
@@ -241,6 +275,131 @@ async def announcement_unschedule(
     )
 
 
+# ─────────────────────────────────────────────────────────────
+# Exports an announcement's signups as TSV (paste-ready) or CSV
+# ─────────────────────────────────────────────────────────────
+@app_commands.default_permissions(manage_messages=True)
+@bot.tree.command(name="announcement_export")
+async def announcement_export(
+    interaction: discord.Interaction,
+    announcement_id: str,
+    format: Literal["tsv", "csv"] = "tsv",
+    compress: bool = False
+):
+    try:
+        announcement_id = uuid.UUID(announcement_id)
+    except ValueError:
+        await interaction.response.send_message(
+            "❌ Invalid announcement ID. Please provide a valid ID.",
+            ephemeral=True
+        )
+        return
+
+    row = await fetchone(
+        "SELECT 1 FROM announcements WHERE id=$1",
+        (announcement_id,)
+    )
+    if not row:
+        await interaction.response.send_message(
+            "❌ Announcement not found.",
+            ephemeral=True
+        )
+        return
+
+    await interaction.response.send_message("⏳ Building export...", ephemeral=True)
+
+    file_buffer, filename = await build_export(
+        interaction.client,
+        announcement_id,
+        fmt=format,
+        compress=compress
+    )
+
+    await interaction.edit_original_response(
+        content="📋 Export ready.",
+        attachments=[discord.File(fp=file_buffer, filename=filename)]
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# Rewrites an announcement's Google Sheet from the database
+# ─────────────────────────────────────────────────────────────
+@app_commands.default_permissions(manage_messages=True)
+@bot.tree.command(name="sheets_reconcile")
+async def sheets_reconcile(
+    interaction: discord.Interaction,
+    announcement_id: str
+):
+    try:
+        announcement_id = uuid.UUID(announcement_id)
+    except ValueError:
+        await interaction.response.send_message(
+            "❌ Invalid announcement ID. Please provide a valid ID.",
+            ephemeral=True
+        )
+        return
+
+    await interaction.response.send_message("⏳ Reconciling sheet...", ephemeral=True)
+
+    differed, text = await reconcile_announcement(interaction.client, announcement_id)
+
+    if differed is None:
+        await interaction.edit_original_response(content=f"❌ Sheet not reconciled: {text}")
+    elif differed:
+        await interaction.edit_original_response(content=f"✅ Sheet reconciled, {differed} cells corrected.")
+    else:
+        await interaction.edit_original_response(content="✅ Sheet already matches the database.")
+
+
+# ─────────────────────────────────────────────────────────────
+# Shows the bot's runtime counters: database queries and pool,
+# dashboard refreshes and caches, Discord edits, Sheets delivery
+# ─────────────────────────────────────────────────────────────
+@app_commands.default_permissions(manage_messages=True)
+@bot.tree.command(name="bot_stats")
+async def bot_stats(interaction: discord.Interaction):
+    await interaction.response.defer(ephemeral=True)
+
+    slowest = list(query_stats().items())[:8]
+    queries = "\n".join(
+        f"`{name}` {stats['calls']}× avg **{stats['avg_ms']:.1f}ms** max {stats['max_ms']:.0f}ms, {stats['slow']} slow"
+        for name, stats in slowest
+    )
+
+    database = discord.Embed(title="🐘 Database", color=discord.Color.blue())
+    database.add_field(name="Queries (most total time first)", value=queries[:1024] or "*None yet*", inline=False)
+    database.add_field(name="Connection pool", value=format_stats(pool_stats()), inline=False)
+
+    runtime = discord.Embed(title="📈 Runtime", color=discord.Color.blue())
+    for name, stats in (
+        ("Dashboard refreshes", refresh_stats()),
+        ("Dashboard snapshot cache", snapshot_cache_stats()),
+        ("Export cache", export_cache_stats()),
+        ("Discord channels / edits", resolver_stats()),
+        ("Member name cache", member_cache_stats()),
+        ("Sheets requests (seconds)", sheets_latency_stats()),
+        ("Sheets circuit breaker", breaker_stats()),
+        ("Sheets outbox", await outbox_stats()),
+        ("Sheets reconcile", reconcile_stats()),
+    ):
+        runtime.add_field(name=name, value=format_stats(stats), inline=True)
+
+    await interaction.followup.send(embeds=[database, runtime], ephemeral=True)
+
+
+# Renders a flat stats dict as "key: value" lines; nested values
+# (histograms) are left out
+def format_stats(stats) -> str:
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            continue
+        if isinstance(value, float):
+            value = f"{value:.2f}"
+        lines.append(f"{key}: **{value}**")
+    return "\n".join(lines)[:1024] or "—"
+
+
 # ─────────────────────────────────────────────────────────────
 # Lists all announcements, including their content and status
 # ─────────────────────────────────────────────────────────────
@@ -276,7 +435,7 @@ async def announcement_view(interaction: discord.Interaction):
         send_at_display = fmt_time(send_at)
         end_at_display = fmt_time(end_at) if end_at else "—"
         
-        status_emoji = {"scheduled": "⏳", "sent": "✅", "closed": "🔒"}.get(state, "❓")
+        status_emoji = {"scheduled": "⏳", "sent": "✅", "closed": "🔒", "failed": "❌"}.get(state, "❓")
         
         # Add Field
         embed_value = (
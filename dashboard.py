@@ -1,122 +1,20 @@
 import os
+import asyncio
 import discord
-from db import fetchone, fetchall
-from time_utils import format_close_time
+from db import fetchone
+from dashboard_snapshot import load_snapshot
 from dashboard_paginator import DashboardPaginator
+from resolver import get_message, edit_if_changed
 from dotenv import load_dotenv
 load_dotenv()
 
-SCHOOLS = ["GT", "Emory", "GSU"]
 ADMIN_CHANNEL_ID = int(os.getenv("ADMIN_CHANNEL_ID"))
-SERVER_ID = int(os.getenv("SERVER_ID"))
-
-# ─────────────────────────────────────────────────────────────
-# Dashboard Rendering:
-# Creates the contents of the admin dashboard
-# Navigation controls are defined in views.py
-# ─────────────────────────────────────────────────────────────
-async def render_dashboard(bot, announcement_id, title, end_at) -> list:
-    # Aggregating Data
-    rows = await fetchall(
-        """
-        SELECT user_id, school, role, seats
-        FROM ride_entries
-        WHERE announcement_id=$1
-        ORDER BY school
-        """,
-        (announcement_id,)
-    )
-
-    data = {s: {"drivers": [], "riders": []} for s in SCHOOLS}
-    guild = bot.get_guild(SERVER_ID)
-
-    for user_id, school, role, seats in rows:
-        if school not in data:
-            continue
-
-        member = None
-        if guild:
-            member = guild.get_member(user_id)
-            if member is None:
-                try:
-                    member = await guild.fetch_member(user_id)
-                except (discord.NotFound, discord.Forbidden, discord.HTTPException):
-                    member = None
-
-        if not member:
-            continue
-
-        name = f"{member.display_name}"
-        if role == "driver":
-            data[school]["drivers"].append((name, seats))
-        else:
-            data[school]["riders"].append(name)
-
-        for school in data:
-            data[school]["drivers"].sort(key=lambda x: x[0].casefold())
-            data[school]["riders"].sort(key=lambda x: x.casefold())
-
-    # Creating First Page Cover (1/4)
-    cover = discord.Embed(
-        title=title,
-        description=(format_close_time(end_at)),
-        color=discord.Color.blue()
-    )
-
-    for school in SCHOOLS:
-        drivers = data[school]["drivers"]
-        riders = data[school]["riders"]
-
-        seat_total = sum(seats for _, seats in drivers)
-        rider_count = len(riders)
-        status = "✅" if seat_total >= rider_count else "❌"
-
-        cover.add_field(
-            name=f"🏫 {school}",
-            value=(
-                f"Drivers: **{len(drivers)}**\n"
-                f"Riders: **{rider_count}**\n"
-                f"Seats: **{seat_total}** {status}"
-            ),
-            inline=False
-        )
-
-    embeds = [cover]
-
-    # Creating School-Based Page Covers (2/4, 3/4, 4/4)
-    for school in SCHOOLS:
-        drivers = data[school]["drivers"]
-        riders = data[school]["riders"]
-
-        driver_lines = (
-            "\n".join(f"🚗 {name} — {seats} seats" for name, seats in drivers)
-            if drivers else "*None*"
-        )
-
-        rider_lines = (
-            "\n".join(f"🙋 {name}" for name in riders)
-            if riders else "*None*"
-        )
-
-        seat_total = sum(seats for _, seats in drivers)
-        rider_count = len(riders)
-        status = "✅" if seat_total >= rider_count else "❌"
-
-        embeds.append(
-            discord.Embed(
-                title=f"🏫 {school} — Ride Signups",
-                description=(
-                    f"**Drivers**\n{driver_lines}\n\n"
-                    f"**Riders**\n{rider_lines}\n\n"
-                    f"**Summary**\n"
-                    f"Seats: **{seat_total}** | Riders: **{rider_count}** {status}"
-                ),
-                color=discord.Color.blue()
-            )
-        )
-
-    return embeds
+REFRESH_WINDOW = float(os.getenv("DASHBOARD_REFRESH_WINDOW", "2"))  # seconds between edits
 
+_pending_refreshes = {}  # announcement_id -> running refresh task
+_dirty = set()  # announcements changed while their refresh was already rendering
+_last_refresh = {}  # announcement_id -> loop time of the last applied refresh
+_refresh_stats = {"requested": 0, "applied": 0}
 
 # ─────────────────────────────────────────────────────────────
 # Refreshes admin dashboard for a specific announcement 
@@ -124,50 +22,96 @@ async def render_dashboard(bot, announcement_id, title, end_at) -> list:
 async def refresh_dashboard_for_announcement(bot, announcement_id):
     row = await fetchone(
         """
-        SELECT dashboard_message_id, dashboard_page, title, end_at
+        SELECT dashboard_message_id, dashboard_page, title, end_at, version
         FROM announcements
         WHERE id=$1
         """,
-        (announcement_id,)
+        (announcement_id,),
+        name="dashboard.refresh"
     )
     if not row:
         return
 
-    dash_msg_id, page_num, title, end_at = row
+    dash_msg_id, page_num, title, end_at, version = row
     if not dash_msg_id:
         return
 
-    admin_ch = bot.get_channel(ADMIN_CHANNEL_ID)
-    if not admin_ch:
-        try:
-            admin_ch = await bot.fetch_channel(ADMIN_CHANNEL_ID)
-        except Exception:
-            return
-
-    try:
-        dash_msg = await admin_ch.fetch_message(dash_msg_id)
-    except Exception:
+    dash_msg = await get_message(bot, ADMIN_CHANNEL_ID, dash_msg_id)
+    if not dash_msg:
         return
 
-    embeds = await render_dashboard(
+    snapshot = await load_snapshot(
         bot=bot,
         announcement_id=announcement_id,
         title=title,
         end_at=end_at,
+        version=version,
     )
-    if not embeds:
-        return
-
-    page = min(page_num or 0, len(embeds) - 1)
 
     view = DashboardPaginator(
-        embeds=embeds,
+        snapshot=snapshot,
         announcement_id=announcement_id,
-        start_index=page,
+        start_index=page_num or 0,
         title=title,
     )
 
-    await dash_msg.edit(
-        embed=view._current_embed(),
-        view=view,
+    # Partial message: a deleted dashboard surfaces here instead of on fetch
+    try:
+        await edit_if_changed(
+            dash_msg,
+            embed=view._current_embed(),
+            view=view,
+        )
+    except discord.HTTPException:
+        return
+
+
+# ─────────────────────────────────────────────────────────────
+# Coalesced dashboard refresh:
+# Bursts of requests for the same announcement are merged into at most
+# one edit per REFRESH_WINDOW. The refresh always re-reads the
+# announcement's version, so the edit that does go out reflects the
+# latest state.
+# ─────────────────────────────────────────────────────────────
+def request_dashboard_refresh(bot, announcement_id):
+    key = str(announcement_id)
+    _refresh_stats["requested"] += 1
+
+    if key in _pending_refreshes:
+        _dirty.add(key)
+        return
+
+    _pending_refreshes[key] = asyncio.create_task(
+        _run_coalesced_refresh(bot, announcement_id, key)
     )
+
+
+async def _run_coalesced_refresh(bot, announcement_id, key):
+    loop = asyncio.get_running_loop()
+
+    try:
+        while True:
+            delay = _last_refresh.get(key, 0) + REFRESH_WINDOW - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            _dirty.discard(key)
+            _last_refresh[key] = loop.time()
+            try:
+                await refresh_dashboard_for_announcement(bot, announcement_id)
+            except Exception as e:
+                print(f"[dashboard] refresh error for {announcement_id}: {e}")
+            _refresh_stats["applied"] += 1
+
+            if key not in _dirty:
+                break
+    finally:
+        _pending_refreshes.pop(key, None)
+
+
+# Returns how many refreshes were requested, applied and skipped by coalescing
+def refresh_stats() -> dict:
+    return {
+        **_refresh_stats,
+        "skipped": _refresh_stats["requested"] - _refresh_stats["applied"],
+    }
@@ -1,98 +1,84 @@
-import io
+import uuid
 import discord
-from db import execute
-from exporter import get_pasteable_text
+from db import execute, fetchone
+from exporter import build_export
+from dashboard_snapshot import load_snapshot
+from resolver import remember_render
 
-# ─────────────────────────────────────────────────────────────
-# Dashboard Paginator View
-# Manages the buttons on the admin dashboard
-# ─────────────────────────────────────────────────────────────
-class DashboardPaginator(discord.ui.View):
-    def __init__(self, embeds, announcement_id, title, start_index=0):
-        super().__init__(timeout=None)
+DASHBOARD_BUTTONS = {
+    "prev": ("◀️ Prev", discord.ButtonStyle.secondary),
+    "next": ("▶️ Next", discord.ButtonStyle.secondary),
+    "export": ("📊 Export Snapshot", discord.ButtonStyle.success),
+}
 
-        self.embeds = embeds
-        self.announcement_id = announcement_id
-        self.title = title
-        self.index = start_index
 
-        self.prev_button = discord.ui.Button(
-            label="◀️ Prev",
-            style=discord.ButtonStyle.secondary,
-            custom_id=f"dashboard:prev:{announcement_id}"
-        )
-        self.next_button = discord.ui.Button(
-            label="▶️ Next",
-            style=discord.ButtonStyle.secondary,
-            custom_id=f"dashboard:next:{announcement_id}"
-        )
-        self.export_button = discord.ui.Button(
-            label="📊 Export Snapshot",
-            style=discord.ButtonStyle.success,
-            custom_id=f"dashboard:export:{announcement_id}"
+# ─────────────────────────────────────────────────────────────
+# Dashboard Buttons
+# Resolved from their custom id template at click time; the current
+# page is read from the database and rendered from the cached snapshot
+# ─────────────────────────────────────────────────────────────
+class DashboardButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"dashboard:(?P<action>prev|next|export):(?P<id>[0-9a-fA-F-]{36})",
+):
+    def __init__(self, action, announcement_id):
+        label, style = DASHBOARD_BUTTONS[action]
+        super().__init__(
+            discord.ui.Button(
+                label=label,
+                style=style,
+                custom_id=f"dashboard:{action}:{announcement_id}"
+            )
         )
-        self.prev_button.callback = self.on_prev
-        self.next_button.callback = self.on_next
-        self.export_button.callback = self.on_export
-
-        self.add_item(self.prev_button)
-        self.add_item(self.next_button)
-        self.add_item(self.export_button)
-        self._update_buttons()
+        self.action = action
+        self.announcement_id = announcement_id
 
-    # Ensures buttons are enabled/disabled correctly 
-    # e.g. Admin cannot click next on the last page
-    def _update_buttons(self):
-        self.prev_button.disabled = self.index <= 0
-        self.next_button.disabled = self.index >= len(self.embeds) - 1
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["action"], uuid.UUID(match["id"]))
 
-    # Renders current pagination status
-    def _current_embed(self):
-        self._update_buttons()
-        embed = self.embeds[self.index].copy()
-        embed.set_footer(text=f"Page {self.index + 1}/{len(self.embeds)}")
-        return embed
+    async def callback(self, interaction: discord.Interaction):
+        if self.action == "export":
+            await self.on_export(interaction)
+        else:
+            await self.on_flip(interaction, -1 if self.action == "prev" else 1)
 
-    async def on_prev(self, interaction: discord.Interaction):
-        if self.index <= 0:
+    async def on_flip(self, interaction: discord.Interaction, step):
+        row = await fetchone(
+            "SELECT title, end_at, dashboard_page, version FROM announcements WHERE id=$1",
+            (self.announcement_id,),
+            name="dashboard.flip"
+        )
+        if not row:
             await interaction.response.defer()
             return
 
-        self.index -= 1
-        await execute(
-            "UPDATE announcements SET dashboard_page=$1 WHERE id=$2",
-            (self.index, self.announcement_id)
-        )
-
-        await interaction.response.edit_message(
-            embed=self._current_embed(),
-            view=self
-        )
-
-    async def on_next(self, interaction: discord.Interaction):
-        if self.index >= len(self.embeds) - 1:
+        title, end_at, page, version = row
+        snapshot = await load_snapshot(interaction.client, self.announcement_id, title, end_at, version)
+        index = min(page or 0, snapshot.page_count - 1) + step
+        if index < 0 or index >= snapshot.page_count:
             await interaction.response.defer()
             return
 
-        self.index += 1
         await execute(
             "UPDATE announcements SET dashboard_page=$1 WHERE id=$2",
-            (self.index, self.announcement_id)
+            (index, self.announcement_id)
         )
 
+        view = DashboardPaginator(snapshot, self.announcement_id, title, start_index=index)
+        embed = view._current_embed()
         await interaction.response.edit_message(
-            embed=self._current_embed(),
-            view=self
+            embed=embed,
+            view=view
         )
+        remember_render(interaction.message.id, embed=embed, view=view)
 
     async def on_export(self, interaction: discord.Interaction):
-        csv_text = await get_pasteable_text(
+        file_buffer, filename = await build_export(
             interaction.client,
             self.announcement_id
         )
 
-        file_buffer = io.BytesIO(csv_text.encode("utf-8"))
-
         await interaction.response.send_message(
             content=(
                 "📋 **How to use this export**\n"
@@ -101,6 +87,43 @@ class DashboardPaginator(discord.ui.View):
                 "3. Copy everything\n"
                 "4. Paste into the Google Sheets template accordingly"
             ),
-            file=discord.File(fp=file_buffer, filename="rides_export.txt"),
+            file=discord.File(fp=file_buffer, filename=filename),
             ephemeral=True
         )
+
+
+# ─────────────────────────────────────────────────────────────
+# Dashboard Paginator View
+# Lays out the buttons on the admin dashboard for one page
+# Pages are rendered on demand from the snapshot
+# ─────────────────────────────────────────────────────────────
+class DashboardPaginator(discord.ui.View):
+    def __init__(self, snapshot, announcement_id, title, start_index=0):
+        super().__init__(timeout=None)
+
+        self.snapshot = snapshot
+        self.announcement_id = announcement_id
+        self.title = title
+        self.index = min(max(start_index, 0), snapshot.page_count - 1)
+
+        self.prev_button = DashboardButton("prev", announcement_id)
+        self.next_button = DashboardButton("next", announcement_id)
+        self.export_button = DashboardButton("export", announcement_id)
+
+        self.add_item(self.prev_button)
+        self.add_item(self.next_button)
+        self.add_item(self.export_button)
+        self._update_buttons()
+
+    # Ensures buttons are enabled/disabled correctly
+    # e.g. Admin cannot click next on the last page
+    def _update_buttons(self):
+        self.prev_button.item.disabled = self.index <= 0
+        self.next_button.item.disabled = self.index >= self.snapshot.page_count - 1
+
+    # Renders only the current page, with pagination status
+    def _current_embed(self):
+        self._update_buttons()
+        embed = self.snapshot.render_page(self.index)
+        embed.set_footer(text=f"Page {self.index + 1}/{self.snapshot.page_count}")
+        return embed
@@ -0,0 +1,235 @@
+import os
+import discord
+from db import fetchall
+from time_utils import format_close_time
+from members import resolve_display_names
+from render_cache import VersionedCache
+from dotenv import load_dotenv
+load_dotenv()
+
+SCHOOLS = ["GT", "Emory", "GSU"]
+SERVER_ID = int(os.getenv("SERVER_ID"))
+EMBED_DESCRIPTION_LIMIT = 4096  # Discord's hard cap on embed descriptions
+RENDER_CACHE_BYTES = int(os.getenv("RENDER_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+_snapshots = VersionedCache(RENDER_CACHE_BYTES)  # announcement_id -> DashboardSnapshot
+
+
+# ─────────────────────────────────────────────────────────────
+# Dashboard Data:
+# Cover-page totals come from one grouped aggregate query; the
+# per-school rosters come from one query ordered by school and role
+# ─────────────────────────────────────────────────────────────
+async def load_dashboard_totals(announcement_id) -> dict:
+    rows = await fetchall(
+        """
+        SELECT school, role, COUNT(*) AS entries, COALESCE(SUM(seats), 0) AS seats
+        FROM ride_entries
+        WHERE announcement_id=$1
+        GROUP BY school, role
+        """,
+        (announcement_id,),
+        name="dashboard.totals"
+    )
+
+    totals = {s: {"drivers": 0, "riders": 0, "seats": 0} for s in SCHOOLS}
+
+    for school, role, entries, seats in rows:
+        if school not in totals:
+            continue
+
+        if role == "driver":
+            totals[school]["drivers"] += entries
+            totals[school]["seats"] += seats
+        else:
+            totals[school]["riders"] += entries
+
+    return totals
+
+
+async def load_school_rosters(bot, announcement_id) -> dict:
+    rows = await fetchall(
+        """
+        SELECT school, role, user_id, seats
+        FROM ride_entries
+        WHERE announcement_id=$1
+        ORDER BY school, role
+        """,
+        (announcement_id,),
+        name="dashboard.rosters"
+    )
+
+    data = {s: {"drivers": [], "riders": []} for s in SCHOOLS}
+    names = await resolve_display_names(
+        bot.get_guild(SERVER_ID),
+        [user_id for _, _, user_id, _ in rows]
+    )
+
+    for school, role, user_id, seats in rows:
+        if school not in data:
+            continue
+
+        # Skip users no longer in the server
+        name = names.get(user_id)
+        if name is None:
+            continue
+
+        if role == "driver":
+            data[school]["drivers"].append((name, seats))
+        else:
+            data[school]["riders"].append(name)
+
+    # Sorted once per list, after every row has been placed
+    for school in data:
+        data[school]["drivers"].sort(key=lambda x: x[0].casefold())
+        data[school]["riders"].sort(key=lambda x: x.casefold())
+
+    return data
+
+
+# ─────────────────────────────────────────────────────────────
+# Dashboard Snapshot:
+# Aggregate state of one announcement's signups. Page boundaries are
+# laid out up front from line lengths; embeds are only built when a
+# page is actually requested, then kept with the snapshot. Large
+# schools split across several pages instead of being truncated at
+# EMBED_DESCRIPTION_LIMIT.
+# ─────────────────────────────────────────────────────────────
+class DashboardSnapshot:
+    def __init__(self, announcement_id, title, end_at, totals, rosters):
+        self.announcement_id = announcement_id
+        self.title = title
+        self.end_at = end_at
+        self.totals = totals
+        self.rosters = rosters
+        self._embeds = {}  # page index -> rendered embed
+
+        # Page 0 is the cover; every other entry is (school, lines, part, parts)
+        self._pages = [None]
+        for school in SCHOOLS:
+            chunks = _chunk_lines(self._school_lines(school), EMBED_DESCRIPTION_LIMIT)
+            for part, lines in enumerate(chunks, start=1):
+                self._pages.append((school, lines, part, len(chunks)))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    # Rough memory footprint for the render cache: page text held twice
+    # (lines and rendered embeds) plus a fixed allowance for the totals
+    @property
+    def size(self) -> int:
+        text = sum(len(line) + 1 for _, lines, _, _ in self._pages[1:] for line in lines)
+        return 2 * text + 1024
+
+    def render_page(self, index) -> discord.Embed:
+        index = min(max(index, 0), self.page_count - 1)
+
+        # The cover shows open/closed from the current time, which the
+        # version does not track, so it is never memoized
+        if index == 0:
+            return self._render_cover()
+
+        embed = self._embeds.get(index)
+        if embed is None:
+            embed = self._embeds[index] = self._render_page(index)
+        return embed
+
+    def _render_page(self, index) -> discord.Embed:
+        school, lines, part, parts = self._pages[index]
+        title = f"🏫 {school} — Ride Signups"
+        if parts > 1:
+            title += f" ({part}/{parts})"
+
+        return discord.Embed(
+            title=title,
+            description="\n".join(lines),
+            color=discord.Color.blue()
+        )
+
+    # Creating First Page Cover
+    def _render_cover(self) -> discord.Embed:
+        cover = discord.Embed(
+            title=self.title,
+            description=(format_close_time(self.end_at)),
+            color=discord.Color.blue()
+        )
+
+        for school in SCHOOLS:
+            seat_total = self.totals[school]["seats"]
+            rider_count = self.totals[school]["riders"]
+            status = "✅" if seat_total >= rider_count else "❌"
+
+            cover.add_field(
+                name=f"🏫 {school}",
+                value=(
+                    f"Drivers: **{self.totals[school]['drivers']}**\n"
+                    f"Riders: **{rider_count}**\n"
+                    f"Seats: **{seat_total}** {status}"
+                ),
+                inline=False
+            )
+
+        return cover
+
+    # Description lines for a school page, before splitting
+    def _school_lines(self, school) -> list:
+        drivers = self.rosters[school]["drivers"]
+        riders = self.rosters[school]["riders"]
+
+        seat_total = self.totals[school]["seats"]
+        rider_count = self.totals[school]["riders"]
+        status = "✅" if seat_total >= rider_count else "❌"
+
+        return [
+            "**Drivers**",
+            *([f"🚗 {name} — {seats} seats" for name, seats in drivers] or ["*None*"]),
+            "",
+            "**Riders**",
+            *([f"🙋 {name}" for name in riders] or ["*None*"]),
+            "",
+            "**Summary**",
+            f"Seats: **{seat_total}** | Riders: **{rider_count}** {status}",
+        ]
+
+
+# Greedily packs lines into chunks whose joined length fits within limit
+def _chunk_lines(lines, limit) -> list:
+    chunks = [[]]
+    size = 0
+
+    for line in lines:
+        added = len(line) + (1 if chunks[-1] else 0)
+        if chunks[-1] and size + added > limit:
+            chunks.append([])
+            added = len(line)
+            size = 0
+        chunks[-1].append(line)
+        size += added
+
+    return chunks
+
+
+# ─────────────────────────────────────────────────────────────
+# Snapshot cache:
+# Snapshots are cached by (announcement_id, version); signups,
+# withdrawals and edits bump announcements.version, so an unchanged
+# announcement is served from memory and a changed one is reloaded
+# ─────────────────────────────────────────────────────────────
+async def load_snapshot(bot, announcement_id, title, end_at, version) -> DashboardSnapshot:
+    key = str(announcement_id)
+    snapshot = _snapshots.get(key, version)
+    if snapshot is not None:
+        return snapshot
+
+    totals = await load_dashboard_totals(announcement_id)
+    rosters = await load_school_rosters(bot, announcement_id)
+
+    snapshot = DashboardSnapshot(announcement_id, title, end_at, totals, rosters)
+    _snapshots.put(key, version, snapshot, snapshot.size)
+    return snapshot
+
+
+# Returns snapshot cache hit/miss/eviction counters
+def snapshot_cache_stats() -> dict:
+    return _snapshots.stats()
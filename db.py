@@ -1,4 +1,8 @@
 import os
+import re
+import time
+import asyncio
+import contextlib
 import asyncpg
 from dotenv import load_dotenv
 load_dotenv()
@@ -7,30 +11,332 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is required")
 
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "10"))  # seconds waiting for a free connection
+COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))  # seconds per statement
+MAX_IDLE_LIFETIME = float(os.getenv("DB_MAX_IDLE_LIFETIME", "300"))  # seconds before an idle connection is closed
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))  # prepared statements kept per connection
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+EXPLAIN_SLOW_QUERIES = os.getenv("EXPLAIN_SLOW_QUERIES", "false").lower() == "true"
+EXPLAIN_INTERVAL = 300  # seconds between plan captures for the same query
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)  # upper bounds; one overflow bucket after
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+MIGRATION_LOCK_ID = 7240001  # pg_advisory_lock key held while migrating
+
 _pool = None
+_names = {}  # sql -> query name
+_query_stats = {}  # name -> call counts, latency histogram, last plan
+_pool_stats = {
+    "acquired": 0,
+    "in_use": 0,
+    "peak_in_use": 0,
+    "waiting": 0,
+    "peak_waiting": 0,
+    "wait_total_ms": 0.0,
+    "wait_max_ms": 0.0,
+    "wait_histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+    "acquire_timeouts": 0,
+    "command_timeouts": 0,
+}
 
 
 async def init_db():
     global _pool
-    _pool = await asyncpg.create_pool(DATABASE_URL)
+    _pool = await asyncpg.create_pool(
+        DATABASE_URL,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        command_timeout=COMMAND_TIMEOUT,
+        max_inactive_connection_lifetime=MAX_IDLE_LIFETIME,
+        statement_cache_size=STATEMENT_CACHE_SIZE,
+    )
+
+    await migrate()
+
+
+# ─────────────────────────────────────────────────────────────
+# Schema migrations
+# migrations/NNN_name.sql files are applied once each, in version
+# order, and recorded in schema_migrations; when every file is already
+# recorded, boot costs a single SELECT. A file starting with
+# "-- migrate: no-transaction" runs statement by statement outside a
+# transaction, which CREATE/DROP INDEX CONCURRENTLY requires. Keep those
+# statements re-runnable (IF [NOT] EXISTS): a failure part-way leaves
+# the earlier ones applied, and a failed concurrent build leaves an
+# INVALID index that has to be dropped before retrying.
+# ─────────────────────────────────────────────────────────────
+async def migrate():
+    files = _migration_files()
+
+    # Own connection: no pool command timeout for long index builds
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        applied = await _applied_versions(conn)
+        if all(version in applied for version, _ in files):
+            return
+
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        try:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                )
+                """
+            )
+
+            # Another instance may have migrated while we waited for the lock
+            applied = await _applied_versions(conn)
+            for version, filename in files:
+                if version not in applied:
+                    await _apply_migration(conn, version, filename)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+    finally:
+        await conn.close()
+
+
+def _migration_files() -> list:
+    files = {}
+    for filename in os.listdir(MIGRATIONS_DIR):
+        prefix = filename.split("_", 1)[0]
+        if not filename.endswith(".sql") or not prefix.isdigit():
+            continue
+        if int(prefix) in files:
+            raise RuntimeError(f"Duplicate migration version {prefix}: {files[int(prefix)]}, {filename}")
+        files[int(prefix)] = filename
+    return sorted(files.items())
+
+
+async def _applied_versions(conn) -> set:
+    try:
+        rows = await conn.fetch("SELECT version FROM schema_migrations")
+    except asyncpg.UndefinedTableError:
+        return set()
+    return {row["version"] for row in rows}
+
+
+async def _apply_migration(conn, version, filename):
+    with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+        sql = f.read()
+
+    started = time.perf_counter()
+    record = "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)"
+
+    if sql.startswith(NO_TRANSACTION_MARKER):
+        for statement in re.split(r";[ \t]*$", sql, flags=re.MULTILINE):
+            if _strip_comments(statement):
+                await conn.execute(statement)
+        await conn.execute(record, version, filename)
+    else:
+        async with conn.transaction():
+            await conn.execute(sql)
+            await conn.execute(record, version, filename)
+
+    print(f"[db] applied migration {filename} in {time.perf_counter() - started:.1f}s")
+
+
+def _strip_comments(statement) -> str:
+    lines = [line for line in statement.splitlines() if not line.strip().startswith("--")]
+    return "\n".join(lines).strip()
+
+
+# ─────────────────────────────────────────────────────────────
+# Pool checkout
+# Every helper borrows its connection here, so the time spent waiting
+# for a free connection, the number in use / waiting and acquire
+# timeouts (DB_ACQUIRE_TIMEOUT) are visible in pool_stats()
+# ─────────────────────────────────────────────────────────────
+@contextlib.asynccontextmanager
+async def _connection():
+    _pool_stats["waiting"] += 1
+    _pool_stats["peak_waiting"] = max(_pool_stats["peak_waiting"], _pool_stats["waiting"])
+    started = time.perf_counter()
+    try:
+        conn = await _pool.acquire(timeout=ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _pool_stats["acquire_timeouts"] += 1
+        print(f"[db] no free connection after {ACQUIRE_TIMEOUT:g}s (pool max {POOL_MAX_SIZE})")
+        raise
+    finally:
+        _pool_stats["waiting"] -= 1
+
+    waited_ms = (time.perf_counter() - started) * 1000
+    _pool_stats["acquired"] += 1
+    _pool_stats["wait_total_ms"] += waited_ms
+    _pool_stats["wait_max_ms"] = max(_pool_stats["wait_max_ms"], waited_ms)
+    _pool_stats["wait_histogram"][_bucket(waited_ms)] += 1
+    _pool_stats["in_use"] += 1
+    _pool_stats["peak_in_use"] = max(_pool_stats["peak_in_use"], _pool_stats["in_use"])
+
+    try:
+        yield conn
+    finally:
+        _pool_stats["in_use"] -= 1
+        await _pool.release(conn)
+
+
+def _bucket(elapsed_ms) -> int:
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+# ─────────────────────────────────────────────────────────────
+# Named query registry
+# Hot statements pass a name to execute/fetchone/fetchall, e.g.
+#   await fetchone("""...""", params, name="signup.register")
+# The name labels the statement in query_stats() and slow-query logs;
+# unnamed SQL is labelled by its first few words. asyncpg prepares each
+# distinct statement once per pooled connection and reuses it after
+# (up to DB_STATEMENT_CACHE_SIZE statements per connection).
+# ─────────────────────────────────────────────────────────────
+def _label(query, name) -> str:
+    if name is not None:
+        _names[query] = name
+        return name
+
+    label = _names.get(query)
+    if label is None:
+        label = _names[query] = " ".join(query.split())[:60]
+    return label
+
+
+# Records one call; slow calls are logged and, if EXPLAIN_SLOW_QUERIES
+# is on, their plan is captured in the background
+def _record(query, params, name, started):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    name = _label(query, name)
+
+    stats = _query_stats.get(name)
+    if stats is None:
+        stats = _query_stats[name] = {
+            "calls": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "slow": 0,
+            "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            "plan": None,
+            "plan_at": 0.0,
+        }
+
+    stats["calls"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    stats["histogram"][_bucket(elapsed_ms)] += 1
+
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+
+    stats["slow"] += 1
+    print(f"[db] slow query {name}: {elapsed_ms:.0f}ms")
+
+    if EXPLAIN_SLOW_QUERIES and time.monotonic() - stats["plan_at"] > EXPLAIN_INTERVAL:
+        stats["plan_at"] = time.monotonic()
+        asyncio.get_running_loop().create_task(_capture_plan(name, query, params))
+
+
+# EXPLAIN without ANALYZE, so data-modifying statements are not re-run
+async def _capture_plan(name, query, params):
+    try:
+        async with _connection() as conn:
+            rows = await conn.fetch("EXPLAIN " + query, *params)
+    except Exception as e:
+        print(f"[db] explain failed for {name}: {e}")
+        return
+
+    plan = "\n".join(row[0] for row in rows)
+    _query_stats[name]["plan"] = plan
+    print(f"[db] plan for {name}:\n{plan}")
+
+
+async def execute(query, params=(), name=None):
+    async with _connection() as conn:
+        started = time.perf_counter()
+        try:
+            await conn.execute(query, *params)
+        except asyncio.TimeoutError:
+            _pool_stats["command_timeouts"] += 1
+            raise
+        finally:
+            _record(query, params, name, started)
+
+
+async def fetchone(query, params=(), name=None):
+    async with _connection() as conn:
+        started = time.perf_counter()
+        try:
+            return await conn.fetchrow(query, *params)
+        except asyncio.TimeoutError:
+            _pool_stats["command_timeouts"] += 1
+            raise
+        finally:
+            _record(query, params, name, started)
 
-    with open("schema.sql") as f:
-        schema = f.read()
 
-    async with _pool.acquire() as conn:
-        await conn.execute(schema)
+async def fetchall(query, params=(), name=None):
+    async with _connection() as conn:
+        started = time.perf_counter()
+        try:
+            return await conn.fetch(query, *params)
+        except asyncio.TimeoutError:
+            _pool_stats["command_timeouts"] += 1
+            raise
+        finally:
+            _record(query, params, name, started)
 
 
-async def execute(query, params=()):
-    async with _pool.acquire() as conn:
-        await conn.execute(query, *params)
+# Streams a query through a server-side cursor, size rows at a time,
+# so large result sets are never held in memory all at once
+async def fetch_chunks(query, params=(), size=500):
+    async with _connection() as conn:
+        async with conn.transaction():
+            cursor = await conn.cursor(query, *params)
+            while True:
+                rows = await cursor.fetch(size)
+                if not rows:
+                    break
+                yield rows
 
 
-async def fetchone(query, params=()):
-    async with _pool.acquire() as conn:
-        return await conn.fetchrow(query, *params)
+# Returns per-query stats, most total time first:
+# calls, total/avg/max ms, slow count, latency histogram keyed by
+# bucket upper bound in ms ("inf" for the overflow), last captured plan
+def query_stats() -> dict:
+    bounds = [str(b) for b in LATENCY_BUCKETS_MS] + ["inf"]
+    ordered = sorted(_query_stats.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    return {
+        name: {
+            "calls": stats["calls"],
+            "total_ms": stats["total_ms"],
+            "avg_ms": stats["total_ms"] / stats["calls"],
+            "max_ms": stats["max_ms"],
+            "slow": stats["slow"],
+            "histogram": dict(zip(bounds, stats["histogram"])),
+            "plan": stats["plan"],
+        }
+        for name, stats in ordered
+    }
 
 
-async def fetchall(query, params=()):
-    async with _pool.acquire() as conn:
-        return await conn.fetch(query, *params)
+# Returns pool size and checkout metrics: connections open / idle /
+# in use (and peak), tasks waiting (and peak), acquire wait time
+# avg/max/histogram, acquire and statement timeouts
+def pool_stats() -> dict:
+    bounds = [str(b) for b in LATENCY_BUCKETS_MS] + ["inf"]
+    acquired = _pool_stats["acquired"]
+    return {
+        "size": _pool.get_size() if _pool else 0,
+        "idle": _pool.get_idle_size() if _pool else 0,
+        "min_size": POOL_MIN_SIZE,
+        "max_size": POOL_MAX_SIZE,
+        **{k: v for k, v in _pool_stats.items() if k != "wait_histogram"},
+        "wait_avg_ms": _pool_stats["wait_total_ms"] / acquired if acquired else 0.0,
+        "wait_histogram": dict(zip(bounds, _pool_stats["wait_histogram"])),
+    }
@@ -1,9 +1,14 @@
-import asyncio
 import io
 import os
+import csv
+import gzip
+import tempfile
 import aiohttp
-import traceback
-from db import fetchall
+import time
+from collections import deque
+from db import fetchone, fetchall, fetch_chunks
+from members import resolve_display_names
+from render_cache import VersionedCache
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -14,155 +19,473 @@ SCHOOL_CONFIG = [
 ]
 
 GOOGLE_URL = os.getenv("GOOGLE_URL")
+REQUEST_TIMEOUT = 15  # seconds, upper bound for the adaptive timeout
+MIN_TIMEOUT = 3  # seconds, lower bound for the adaptive timeout
+TIMEOUT_MULTIPLIER = 3  # timeout = p99 of recent healthy latency x this
+LATENCY_WINDOW = 200  # recent successful calls the p99 is taken over
+LATENCY_MIN_SAMPLES = 20  # below this, REQUEST_TIMEOUT is used
+BREAKER_THRESHOLD = int(os.getenv("SHEETS_BREAKER_THRESHOLD", "5"))  # consecutive failures before opening
+BREAKER_COOLDOWN = float(os.getenv("SHEETS_BREAKER_COOLDOWN", "30"))  # seconds open before a probe
+CONNECTION_LIMIT = int(os.getenv("SHEETS_CONNECTION_LIMIT", "10"))
+DNS_CACHE_TTL = 300  # seconds
+KEEPALIVE_TIMEOUT = 60  # seconds
+EXPORT_CHUNK_SIZE = 500  # rows read from the cursor at a time
+EXPORT_SPOOL_SIZE = 1024 * 1024  # bytes kept in memory before spilling to disk
+EXPORT_CACHE_BYTES = int(os.getenv("EXPORT_CACHE_BYTES", str(16 * 1024 * 1024)))
 _add = "add"
 _delete = "delete"
 _reset = "reset"
+_batch = "batch"
+_replace = "replace"
 
-async def sync_to_sheets(member, announcement_id, school, role, seats, phone, info, count, content_category):
-    
+_session = None
+_latency = {"calls": 0, "total": 0.0, "max": 0.0}
+_exports = VersionedCache(EXPORT_CACHE_BYTES)  # (announcement_id, fmt, compress) -> file bytes
+
+
+# ─────────────────────────────────────────────────────────────
+# Shared HTTP client
+# One keep-alive session to GOOGLE_URL for the whole bot lifetime,
+# instead of a new TCP+TLS handshake per request.
+# Closed by the bot on shutdown (see bot.py).
+# ─────────────────────────────────────────────────────────────
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTION_LIMIT,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+# ─────────────────────────────────────────────────────────────
+# Circuit breaker for GOOGLE_URL
+# After BREAKER_THRESHOLD consecutive failures (transport errors,
+# timeouts, 5xx / 429, script exceptions) the circuit opens and calls
+# fail fast with CircuitOpenError for BREAKER_COOLDOWN seconds; the
+# outbox keeps the operations queued meanwhile. One probe call is then let through
+# (half-open): success closes the circuit, failure re-opens it.
+# Timeouts track the p99 of recent healthy latency instead of a fixed
+# REQUEST_TIMEOUT, so a degraded endpoint is detected quickly.
+# ─────────────────────────────────────────────────────────────
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Sheets circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"  # closed | open | half_open
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._samples = deque(maxlen=LATENCY_WINDOW)
+        self._listeners = []
+
+    # callback(old_state, new_state) runs on every state change
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _set_state(self, state):
+        old, self.state = self.state, state
+        if old == state:
+            return
+
+        print(f"[sheets] circuit {old} -> {state}")
+        for callback in self._listeners:
+            try:
+                callback(old, state)
+            except Exception as e:
+                print(f"[sheets] circuit listener error: {e}")
+
+    def retry_after(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(self._opened_at + self.cooldown - time.monotonic(), 0.0)
+
+    # Raises CircuitOpenError unless a call may go out now
+    # Returns True if the call is the half-open probe; the caller must
+    # then end_probe() once it finishes, however it finishes
+    def before_call(self) -> bool:
+        if self.state == "open":
+            if self.retry_after() > 0:
+                raise CircuitOpenError(self.retry_after())
+            self._set_state("half_open")
+
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpenError(0.0)
+            self._probing = True
+            return True
+        return False
+
+    def end_probe(self):
+        self._probing = False
+
+    def record_success(self, latency):
+        self._samples.append(latency)
+        self.failures = 0
+        self._set_state("closed")
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self._opened_at = time.monotonic()
+            self._set_state("open")
+
+    def timeout(self) -> float:
+        if len(self._samples) < LATENCY_MIN_SAMPLES:
+            return REQUEST_TIMEOUT
+
+        samples = sorted(self._samples)
+        p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+        return min(max(p99 * TIMEOUT_MULTIPLIER, MIN_TIMEOUT), REQUEST_TIMEOUT)
+
+
+_breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+
+
+def on_breaker_change(callback):
+    _breaker.add_listener(callback)
+
+
+def breaker_retry_after() -> float:
+    return _breaker.retry_after()
+
+
+# Returns circuit state, consecutive failures and the current timeout
+def breaker_stats() -> dict:
+    return {
+        "state": _breaker.state,
+        "failures": _breaker.failures,
+        "timeout": _breaker.timeout(),
+        "retry_after": _breaker.retry_after(),
+    }
+
+
+# Posts payload to the Apps Script and returns (status, text)
+# Raises CircuitOpenError without sending while the circuit is open
+async def _post(payload):
+    probe = _breaker.before_call()
+
+    # Released even if the request is cancelled (CancelledError is not an
+    # Exception), so the breaker cannot stay stuck in half-open
+    try:
+        started = time.perf_counter()
+        try:
+            async with get_session().post(
+                GOOGLE_URL,
+                json=payload,
+                allow_redirects=True,
+                timeout=aiohttp.ClientTimeout(total=_breaker.timeout()),
+            ) as resp:
+                status, text = resp.status, await resp.text()
+        except Exception:
+            _breaker.record_failure()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _latency["calls"] += 1
+            _latency["total"] += elapsed
+            _latency["max"] = max(_latency["max"], elapsed)
+
+        # Script-level exceptions (quota, lock timeouts) count against the
+        # endpoint; data errors like a bad category do not
+        if status >= 500 or status == 429 or text.startswith("Apps Script Error"):
+            _breaker.record_failure()
+        else:
+            _breaker.record_success(elapsed)
+        return status, text
+    finally:
+        if probe:
+            _breaker.end_probe()
+
+
+# Returns call count and average/max latency (seconds) of Sheets requests
+def sheets_latency_stats() -> dict:
+    calls = _latency["calls"]
+    return {
+        "calls": calls,
+        "avg": _latency["total"] / calls if calls else 0.0,
+        "max": _latency["max"],
+    }
+
+
+# Posts one operation to the Apps Script
+# Raises on transport errors; an "Error" reply or non-200 status is
+# returned as (False, text) so the caller can decide whether to retry
+async def post_to_sheets(payload):
+    status, text = await _post(payload)
+    ok = status == 200 and "Error" not in text
+    return ok, text
+
+
+# ─────────────────────────────────────────────────────────────
+# Payload builders
+# Delivered asynchronously through the outbox (see outbox.py)
+# ─────────────────────────────────────────────────────────────
+def entry_payload(action, member, announcement_id, school, role, seats, phone, info, count, content_category) -> dict:
     """
-    Sends a single user's ride entry to the Google Sheet.
+    Builds an add/delete payload for a single user's ride entry.
     The Google Apps Script handles figuring out which columns to put it in.
     """
     clean_category = content_category[0] if type(content_category).__name__ == 'Record' else content_category
     clean_count = count[0] if type(count).__name__ == 'Record' else count
-    
-    payload = {
-        "action": _add,
+
+    return {
+        "action": action,
         "announcement_id": str(announcement_id),
-        "school": str(school), 
-        "role": str(role.lower().strip()),
+        "school": str(school),
+        "role": str(role).lower().strip(),
         "name": str(member.display_name),
         "seats": str(seats) if seats else "",
         "phone": str(phone),
-        "info": str(info) or "",
+        "info": str(info or ""),
         "content_category": str(clean_category),
         "count": str(clean_count)
     }
 
-    timeout = aiohttp.ClientTimeout(total=15)
-    
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        try:
-            async with session.post(GOOGLE_URL, json=payload, allow_redirects=True) as resp:
-                text = await resp.text()
-                
-                return text
-                    
-        except asyncio.TimeoutError:
-            print(f"⚠️ Sheets Sync timed out for {member.display_name}. Google took too long.")
-        except Exception as e:
-            print(f"⚠️ Unexpected Sheets Sync Error: {e}")
-            traceback.print_exc()
-
-async def remove_from_sheets(member, announcement_id, school, role, seats, phone, info, count, content_category):
-    clean_category = content_category[0] if type(content_category).__name__ == 'Record' else content_category
-    clean_count = count[0] if type(count).__name__ == 'Record' else count
 
-    payload = {
-        "action": _delete,
-        "announcement_id": str(announcement_id),
-        "school": str(school), 
-        "role": str(role).lower().strip(),  
-        "name": str(member.display_name),
-        "seats": str(seats) if seats else "",
-        "phone": str(phone),
-        "info": str(info or ""),
-        "count": str(clean_count),                
-        "content_category": str(clean_category) 
-    }
+def add_payload(member, announcement_id, school, role, seats, phone, info, count, content_category) -> dict:
+    return entry_payload(_add, member, announcement_id, school, role, seats, phone, info, count, content_category)
 
-    timeout = aiohttp.ClientTimeout(total=15)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        try:
-            async with session.post(GOOGLE_URL, json=payload, allow_redirects=True) as resp:
-                text = await resp.text()
-                
-                return text
-                    
-        except Exception as e:
-            return (f"⚠️ Sheets Delete Error: {e}")
-
-async def trigger_sheet_reset(announcement_id, content_category):
-    payload = {
+
+def delete_payload(member, announcement_id, school, role, seats, phone, info, count, content_category) -> dict:
+    return entry_payload(_delete, member, announcement_id, school, role, seats, phone, info, count, content_category)
+
+
+def reset_payload(announcement_id, content_category) -> dict:
+    return {
         "action": _reset,
         "announcement_id": str(announcement_id),
         "content_category": str(content_category)
     }
 
-    timeout = aiohttp.ClientTimeout(total=15)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        try:
-            async with session.post(GOOGLE_URL, json=payload, allow_redirects=True) as resp:
-                text = await resp.text()
-                if resp.status == 200 and "Error" not in text:
-                    print(f"✅ Reset Successful: {text}")
-                else:
-                    print(f"❌ Reset Failed: {text}")
-        except Exception as e:
-            print(f"⚠️ Sheets Reset Error: {e}")
-        
-async def get_pasteable_text(bot, announcement_id) -> str:
+
+# Wraps several add/delete/reset payloads into one request; the Apps
+# Script applies them in order with one range write per sheet
+def batch_payload(payloads) -> dict:
+    return {
+        "action": _batch,
+        "operations": list(payloads)
+    }
+
+
+# Replaces the whole sheet with rows (see sheet_grid); the Apps Script
+# writes it in one range write and reports how many cells differed
+def replace_payload(announcement_id, content_category, rows) -> dict:
+    return {
+        "action": _replace,
+        "announcement_id": str(announcement_id),
+        "content_category": str(content_category),
+        "rows": rows
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# Full sheet grid for an announcement, built from ride_entries
+# Same 8-column-per-school layout as the export, but each
+# entry stays on its row_num so later add/delete operations still
+# land on the right cells
+# ─────────────────────────────────────────────────────────────
+async def sheet_grid(bot, announcement_id) -> list:
     rows = await fetchall(
-        "SELECT user_id, school, role, seats, phone, info FROM ride_entries WHERE announcement_id=$1",
+        """
+        SELECT user_id, school, role, seats, phone, info, row_num
+        FROM ride_entries
+        WHERE announcement_id=$1
+        """,
         (announcement_id,)
     )
 
-    organized = {k: {"drivers": [], "riders": []} for k, _ in SCHOOL_CONFIG}
-    guild = bot.get_guild(int(os.getenv("SERVER_ID")))
+    offsets = {key: i * 8 for i, (key, _) in enumerate(SCHOOL_CONFIG)}
+    width = len(SCHOOL_CONFIG) * 8
+    names = await resolve_display_names(
+        bot.get_guild(int(os.getenv("SERVER_ID"))),
+        [uid for uid, *_ in rows]
+    )
 
-    for uid, school, role, seats, phone, info in rows:
-        if school not in organized or not guild:
+    grid = []
+    for uid, school, role, seats, phone, info, row_num in rows:
+        if school not in offsets:
             continue
 
-        member = guild.get_member(uid)
-        if member is None:
-            try:
-                member = await guild.fetch_member(uid)
-            except Exception:
-                continue  # skip users not in server
-
-        name = member.display_name
+        name = names.get(uid)
+        if name is None:
+            continue  # skip users not in server
 
         if role == "driver":
-            organized[school]["drivers"].append((name, seats, phone, info))
+            col = offsets[school]
+            cells = [name, str(seats) if seats else "", phone, info or ""]
         else:
-            organized[school]["riders"].append((name, phone, info))
+            col = offsets[school] + 4
+            cells = [name, phone, info or ""]
 
-    output = io.StringIO()
+        row_num = max(row_num, 1)
+        while len(grid) < row_num:
+            grid.append([""] * width)
+        grid[row_num - 1][col:col + len(cells)] = cells
 
-    max_rows = max(
-        max(len(v["drivers"]), len(v["riders"]))
-        for v in organized.values()
+    return grid
+
+
+# ─────────────────────────────────────────────────────────────
+# Streaming export
+# Rows come off a server-side cursor ranked within each school/role
+# list, so line N of the paste-ready layout (the Nth driver and rider
+# of every school side by side) is written as soon as every list has
+# reached it. Names are resolved one chunk at a time; memory stays
+# flat no matter how many signups an event has.
+# ─────────────────────────────────────────────────────────────
+async def write_export(bot, announcement_id, fp, fmt="tsv") -> int:
+    keys = [key for key, _ in SCHOOL_CONFIG]
+    pending = {(key, role): deque() for key in keys for role in ("driver", "rider")}
+    open_lists = set(pending)  # lists that may still receive entries
+    seen = set()  # lists with an entry at the current rank
+    current_rank = 0
+    write_row = _row_writer(fp, fmt)
+    written = 0
+
+    # Writes every line that no list can still add to
+    def flush():
+        nonlocal written
+        while any(pending.values()) and all(pending[k] or k not in open_lists for k in pending):
+            write_row(_export_row(keys, pending))
+            written += 1
+
+    guild = bot.get_guild(int(os.getenv("SERVER_ID")))
+    chunks = fetch_chunks(
+        """
+        SELECT user_id, school, role, seats, phone, info,
+               ROW_NUMBER() OVER (PARTITION BY school, role ORDER BY row_num, updated_at) AS rank
+        FROM ride_entries
+        WHERE announcement_id=$1
+        ORDER BY rank
+        """,
+        (announcement_id,),
+        EXPORT_CHUNK_SIZE
     )
 
-    for i in range(max_rows):
-        row_parts = []
+    async for chunk in chunks:
+        names = await resolve_display_names(guild, [row["user_id"] for row in chunk])
+
+        for uid, school, role, seats, phone, info, rank in chunk:
+            if rank != current_rank:
+                # A list with no entry at the previous rank has no more entries
+                if current_rank:
+                    open_lists &= seen
+                seen = set()
+                current_rank = rank
+                flush()
+
+            key = (school, "driver" if role == "driver" else "rider")
+            if key not in pending:
+                continue
+            seen.add(key)
+
+            name = names.get(uid)
+            if name is None:
+                continue  # skip users not in server
+
+            if role == "driver":
+                pending[key].append((name, str(seats), phone, info or ""))
+            else:
+                pending[key].append((name, phone, info or ""))
+
+    open_lists.clear()
+    flush()
+    return written
+
+
+# One line of the paste-ready layout: 8 columns per school
+def _export_row(keys, pending) -> list:
+    row_parts = []
+    for key in keys:
+        drivers = pending[(key, "driver")]
+        riders = pending[(key, "rider")]
+        row_parts += [
+            *(drivers.popleft() if drivers else ("", "", "", "")),
+            *(riders.popleft() if riders else ("", "", "")),
+            ""
+        ]
+    return row_parts
+
+
+def _row_writer(fp, fmt):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+
+        def write_csv(row_parts):
+            writer.writerow(row_parts)
+            fp.write(buffer.getvalue().encode("utf-8"))
+            buffer.seek(0)
+            buffer.truncate()
+        return write_csv
+
+    def write_tsv(row_parts):
+        fp.write(("\t".join(row_parts) + "\n").encode("utf-8"))
+    return write_tsv
+
+
+# Builds an export file, returning (file object positioned at 0, filename)
+# Small exports stay in memory and are cached by the announcement's
+# version, so repeated clicks on an unchanged announcement skip the
+# database entirely; large ones spill to a temporary file
+async def build_export(bot, announcement_id, fmt="tsv", compress=False):
+    filename = "rides_export." + ("csv" if fmt == "csv" else "txt")
+    if compress:
+        filename += ".gz"
+
+    # Read before the rows, so a concurrent change can only make the
+    # cached file newer than its version, never older
+    row = await fetchone(
+        "SELECT version FROM announcements WHERE id=$1",
+        (announcement_id,),
+        name="export.version"
+    )
+    version = row[0] if row else None
+    key = (str(announcement_id), fmt, compress)
+
+    data = _exports.get(key, version)
+    if data is not None:
+        return io.BytesIO(data), filename
+
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    target = gzip.GzipFile(fileobj=spool, mode="wb") if compress else spool
 
-        for key, _ in SCHOOL_CONFIG:
-            drivers = organized[key]["drivers"]
-            riders = organized[key]["riders"]
+    await write_export(bot, announcement_id, target, fmt)
 
-            d_name, d_seats, d_phone, d_info = ("", "", "", "")
-            r_name, r_phone, r_info = ("", "", "")
+    if compress:
+        target.close()  # writes the gzip trailer; spool stays open
 
-            if i < len(drivers):
-                d_name, d_seats, d_phone, d_info = drivers[i]
-                d_info = d_info or "" # If d_info is null, d_info = ""
-            if i < len(riders):
-                r_name, r_phone, r_info = riders[i]
+    size = spool.tell()
+    spool.seek(0)
+    if version is None or size > EXPORT_SPOOL_SIZE:
+        return spool, filename
 
-            row_parts += [
-                d_name,
-                str(d_seats),
-                d_phone, 
-                d_info, 
-                r_name,
-                r_phone,
-                r_info,
-                ""
-            ]
+    data = spool.read()
+    spool.close()
+    _exports.put(key, version, data, len(data))
+    return io.BytesIO(data), filename
 
-        output.write("\t".join(row_parts) + "\n")
 
-    return output.getvalue()
+# Returns export cache hit/miss/eviction counters
+def export_cache_stats() -> dict:
+    return _exports.stats()
@@ -1,36 +1,45 @@
+// Target sheet for each content category
+var SHEET_NAMES = {
+  "F": "Friday PM Imports",
+  "S": "Sunday Service Imports"
+};
+var SCHOOLS = ["GT", "Emory", "GSU"];
+
 function doPost(e) {
   try {
     var ss = SpreadsheetApp.getActiveSpreadsheet();
     var payload = JSON.parse(e.postData.contents);
-    
-    var action = payload.action || "add"; 
+
+    var action = payload.action || "add";
+
+    // Several operations in one request (see applyBatch below)
+    if (action === "batch") {
+      return ContentService.createTextOutput(applyBatch(ss, payload.operations || []));
+    }
+
     var aid = payload.announcement_id;
     var content = payload.content_category;
-    var sheetName = "";
-    
+
     // Target the correct sheet based on category
-    if (content === "F") { 
-      sheetName = "Friday PM Imports";
-    } else if (content === "S") {
-      sheetName = "Sunday Service Imports";
-    } else {
+    var sheetName = SHEET_NAMES[content];
+    if (!sheetName) {
       return ContentService.createTextOutput("Error: Invalid content category.");
     }
-   
+
     var sheet = ss.getSheetByName(sheetName);
     if (!sheet) return ContentService.createTextOutput("Error: No sheet found named " + sheetName);
 
     // ==========================================
-    // AUTO-RESET & MEMORY LOGIC 
+    // AUTO-RESET & MEMORY LOGIC
     // ==========================================
     var props = PropertiesService.getDocumentProperties();
-    var memoryKey = "active_aid_" + content; 
+    var memoryKey = "active_aid_" + content;
     var savedAid = props.getProperty(memoryKey);
 
     // TRIGGERED BY PYTHON ON SEND_AT: Wipe sheet and memorize new ID
     if (action === "reset") {
-      sheet.clear(); 
-      props.setProperty(memoryKey, aid); 
+      sheet.clear();
+      props.setProperty(memoryKey, aid);
       return ContentService.createTextOutput("✅ Sheet wiped and tracking new ID: " + aid);
     }
 
@@ -39,49 +48,182 @@ function doPost(e) {
       return ContentService.createTextOutput("⚠️ Ignored: This announcement is no longer active.");
     }
 
-    // Calculates column placements for data
-    var rowNum = parseInt(payload.count);
-    if (rowNum < 1) rowNum = 1; 
+    // Full-sheet reconcile: one bulk write of the whole grid
+    if (action === "replace") {
+      return ContentService.createTextOutput(replaceGrid(sheet, payload.rows || []));
+    }
 
-    var school = payload.school; 
-    var role = payload.role.toLowerCase(); 
-    var schools = ["GT", "Emory", "GSU"];
-    
-    var schoolIndex = schools.indexOf(school);
-    if (schoolIndex === -1) schoolIndex = 0; // Fallback to GT if something goes weird
-    
-    var startIndex = schoolIndex * 8; 
+    var cell = cellPlacement(payload);
 
     // Withdrawal logic
     if (action === "delete") {
-      if (role === "driver") {
-        sheet.getRange(rowNum, startIndex + 1, 1, 4).clearContent();
-      } else {
-        sheet.getRange(rowNum, startIndex + 5, 1, 3).clearContent();
-      }
-      return ContentService.createTextOutput("✅ Cleared row " + rowNum);
+      sheet.getRange(cell.row, cell.col, 1, cell.values.length).clearContent();
+      return ContentService.createTextOutput("✅ Cleared row " + cell.row);
     }
-    
+
     // Sign up logic
     if (action === "add") {
-      if (role === "driver") {
-        sheet.getRange(rowNum, startIndex + 1, 1, 4).setValues([[
-          payload.name, 
-          payload.seats, 
-          payload.phone, 
-          payload.info
-        ]]);
-      } else {
-        sheet.getRange(rowNum, startIndex + 5, 1, 3).setValues([[
-          payload.name, 
-          payload.phone, 
-          payload.info
-        ]]);
-      }
-      return ContentService.createTextOutput("✅ Success adding to row " + rowNum);
+      sheet.getRange(cell.row, cell.col, 1, cell.values.length).setValues([cell.values]);
+      return ContentService.createTextOutput("✅ Success adding to row " + cell.row);
     }
-    
+
   } catch (error) {
     return ContentService.createTextOutput("Apps Script Error: " + error.message);
   }
-}
\ No newline at end of file
+}
+
+// ==========================================
+// CELL PLACEMENT
+// Row comes from count, column block from the school (8 columns each):
+// drivers use the first 4 columns, riders the next 3
+// Deletes place empty strings in the same cells
+// ==========================================
+function cellPlacement(payload) {
+  var rowNum = parseInt(payload.count);
+  if (!(rowNum >= 1)) rowNum = 1;
+
+  var schoolIndex = SCHOOLS.indexOf(payload.school);
+  if (schoolIndex === -1) schoolIndex = 0; // Fallback to GT if something goes weird
+
+  var startIndex = schoolIndex * 8;
+  var isDriver = payload.role.toLowerCase() === "driver";
+  var isDelete = payload.action === "delete";
+
+  var values;
+  if (isDriver) {
+    values = isDelete ? ["", "", "", ""] : [payload.name, payload.seats, payload.phone, payload.info];
+  } else {
+    values = isDelete ? ["", "", ""] : [payload.name, payload.phone, payload.info];
+  }
+
+  return {
+    row: rowNum,
+    col: startIndex + (isDriver ? 1 : 5),
+    values: values
+  };
+}
+
+// ==========================================
+// BATCH LOGIC
+// Applies add/delete/reset operations in order. Cell writes are
+// collected per sheet and flushed with one read and one write of the
+// bounding range, instead of one range write per operation.
+// Operations that cannot apply (bad category, inactive announcement)
+// are skipped and reported without failing the rest of the batch.
+// ==========================================
+function applyBatch(ss, operations) {
+  var props = PropertiesService.getDocumentProperties();
+  var activeAids = {};
+  var pending = {};
+  var applied = 0;
+  var skipped = [];
+
+  for (var i = 0; i < operations.length; i++) {
+    var op = operations[i];
+    var action = op.action || "add";
+    var content = op.content_category;
+
+    var sheetName = SHEET_NAMES[content];
+    var sheet = sheetName ? ss.getSheetByName(sheetName) : null;
+    if (!sheet) {
+      skipped.push(i + ": no sheet for category " + content);
+      continue;
+    }
+
+    var memoryKey = "active_aid_" + content;
+    if (!(memoryKey in activeAids)) {
+      activeAids[memoryKey] = props.getProperty(memoryKey);
+    }
+
+    if (action === "reset") {
+      sheet.clear();
+      props.setProperty(memoryKey, op.announcement_id);
+      activeAids[memoryKey] = op.announcement_id;
+      delete pending[sheetName]; // Earlier writes were for the wiped sheet
+      applied++;
+      continue;
+    }
+
+    var savedAid = activeAids[memoryKey];
+    if (savedAid && savedAid !== op.announcement_id) {
+      skipped.push(i + ": announcement no longer active");
+      continue;
+    }
+
+    if (!pending[sheetName]) {
+      pending[sheetName] = { sheet: sheet, cells: {} };
+    }
+
+    // Later operations on the same cell overwrite earlier ones
+    var cell = cellPlacement(op);
+    for (var j = 0; j < cell.values.length; j++) {
+      pending[sheetName].cells[cell.row + "," + (cell.col + j)] = cell.values[j];
+    }
+    applied++;
+  }
+
+  for (var name in pending) {
+    flushCells(pending[name].sheet, pending[name].cells);
+  }
+
+  var result = "✅ Batch applied " + applied + " operations";
+  if (skipped.length) result += " (skipped " + skipped.join("; ") + ")";
+  return result;
+}
+
+// Writes {"row,col": value} cells with a single read and setValues call
+function flushCells(sheet, cells) {
+  var keys = Object.keys(cells);
+  if (!keys.length) return;
+
+  var minRow = Infinity, maxRow = 0, minCol = Infinity, maxCol = 0;
+  for (var i = 0; i < keys.length; i++) {
+    var parts = keys[i].split(",");
+    var r = parseInt(parts[0]), c = parseInt(parts[1]);
+    minRow = Math.min(minRow, r); maxRow = Math.max(maxRow, r);
+    minCol = Math.min(minCol, c); maxCol = Math.max(maxCol, c);
+  }
+
+  var range = sheet.getRange(minRow, minCol, maxRow - minRow + 1, maxCol - minCol + 1);
+  var grid = range.getValues();
+  for (var k = 0; k < keys.length; k++) {
+    var rc = keys[k].split(",");
+    grid[parseInt(rc[0]) - minRow][parseInt(rc[1]) - minCol] = cells[keys[k]];
+  }
+  range.setValues(grid);
+}
+
+// ==========================================
+// RECONCILE LOGIC
+// Overwrites the sheet with rows (covering anything left over past
+// its edges) using one read and one write, and reports how many cells
+// differed. Nothing is written when the sheet already matches.
+// ==========================================
+function replaceGrid(sheet, rows) {
+  var height = Math.max(rows.length, sheet.getLastRow());
+  var width = sheet.getLastColumn();
+  for (var i = 0; i < rows.length; i++) {
+    width = Math.max(width, rows[i].length);
+  }
+
+  var differed = 0;
+  if (height > 0 && width > 0) {
+    var range = sheet.getRange(1, 1, height, width);
+    var current = range.getValues();
+    var target = [];
+
+    for (var r = 0; r < height; r++) {
+      var row = [];
+      for (var c = 0; c < width; c++) {
+        var value = (rows[r] && rows[r][c] != null) ? rows[r][c] : "";
+        if (String(current[r][c]) !== String(value)) differed++;
+        row.push(value);
+      }
+      target.push(row);
+    }
+
+    if (differed) range.setValues(target);
+  }
+
+  return "✅ Replaced grid, " + differed + " cells differed";
+}
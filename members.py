@@ -0,0 +1,72 @@
+import os
+from collections import OrderedDict
+from dotenv import load_dotenv
+load_dotenv()
+
+MEMBER_CACHE_SIZE = int(os.getenv("MEMBER_CACHE_SIZE", "2000"))
+PREFETCH_CHUNK_SIZE = 100  # Discord caps query_members at 100 user ids
+
+_names = OrderedDict()  # user_id -> display name, LRU order
+_stats = {"hits": 0, "misses": 0, "queries": 0}
+
+
+# ─────────────────────────────────────────────────────────────
+# Member Display-Name Cache
+# Shared by dashboard rendering and exporting. Misses are prefetched
+# in bulk over the gateway instead of one fetch_member call per user.
+# Kept fresh by the member/user update events in bot.py.
+# ─────────────────────────────────────────────────────────────
+def remember_member(member):
+    _names[member.id] = member.display_name
+    _names.move_to_end(member.id)
+    while len(_names) > MEMBER_CACHE_SIZE:
+        _names.popitem(last=False)
+
+
+def forget_member(user_id):
+    _names.pop(user_id, None)
+
+
+# Returns {user_id: display_name} for every user still in the guild
+# Users who have left the server are left out
+async def resolve_display_names(guild, user_ids) -> dict:
+    names = {}
+    if guild is None:
+        return names
+
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        name = _names.get(user_id)
+        if name is not None:
+            _stats["hits"] += 1
+            _names.move_to_end(user_id)
+            names[user_id] = name
+            continue
+
+        _stats["misses"] += 1
+        member = guild.get_member(user_id)
+        if member is not None:
+            remember_member(member)
+            names[user_id] = member.display_name
+        else:
+            missing.append(user_id)
+
+    for i in range(0, len(missing), PREFETCH_CHUNK_SIZE):
+        chunk = missing[i:i + PREFETCH_CHUNK_SIZE]
+        _stats["queries"] += 1
+        try:
+            members = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=True)
+        except Exception as e:
+            print(f"[members] prefetch error: {e}")
+            continue
+
+        for member in members:
+            remember_member(member)
+            names[member.id] = member.display_name
+
+    return names
+
+
+# Returns hit/miss counters and how many bulk queries were made
+def member_cache_stats() -> dict:
+    return {**_stats, "size": len(_names)}
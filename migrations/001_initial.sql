@@ -0,0 +1,155 @@
+-- ─────────────────────────────────────────────────────────────
+-- Baseline schema
+-- Every statement is idempotent, so databases created before
+-- migrations were tracked converge here and are marked version 1
+-- ─────────────────────────────────────────────────────────────
+
+-- ─────────────────────────────────────────────────────────────
+-- Announcements
+-- ─────────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS announcements (
+    id UUID PRIMARY KEY,
+
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    content_category TEXT,
+
+    -- UTC timestamps, timezone-aware
+    send_at TIMESTAMPTZ NOT NULL,
+    end_at TIMESTAMPTZ NOT NULL,
+
+    -- scheduled | sent | closed
+    state TEXT NOT NULL CHECK (state IN ('scheduled', 'sent', 'closed')),
+
+    -- Whether users can interact (buttons enabled)
+    reactable BOOLEAN NOT NULL,
+
+    -- Discord message IDs (snowflakes)
+    message_id BIGINT,
+    dashboard_message_id BIGINT,
+
+    -- Pagination state for admin dashboard
+    dashboard_page INTEGER NOT NULL DEFAULT 0,
+
+    -- Bumped by signups, withdrawals and edits; keys the render/export caches
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- Databases created before the version counter existed
+ALTER TABLE announcements ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+-- ─────────────────────────────────────────────────────────────
+-- Ride Entries
+-- ─────────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS ride_entries (
+    announcement_id UUID NOT NULL
+        REFERENCES announcements(id)
+        ON DELETE CASCADE,
+
+    -- Discord user ID (snowflake)
+    user_id BIGINT NOT NULL,
+
+    school TEXT NOT NULL,
+    role TEXT NOT NULL,
+
+    -- Only meaningful for drivers
+    seats INTEGER CHECK (seats >= 0),
+
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    phone TEXT NOT NULL,
+    info TEXT,
+    row_num INTEGER NOT NULL DEFAULT 1,
+
+    PRIMARY KEY (announcement_id, user_id)
+);
+
+-- ─────────────────────────────────────────────────────────────
+-- Sheet Row Allocation
+-- Each (announcement, school, role) list hands out sheet rows from a
+-- counter; rows freed by withdrawals are reused lowest-first
+-- ─────────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS ride_row_counters (
+    announcement_id UUID NOT NULL
+        REFERENCES announcements(id)
+        ON DELETE CASCADE,
+
+    school TEXT NOT NULL,
+    role TEXT NOT NULL,
+
+    -- Highest row handed out so far
+    last_row INTEGER NOT NULL,
+
+    PRIMARY KEY (announcement_id, school, role)
+);
+
+CREATE TABLE IF NOT EXISTS ride_free_rows (
+    announcement_id UUID NOT NULL
+        REFERENCES announcements(id)
+        ON DELETE CASCADE,
+
+    school TEXT NOT NULL,
+    role TEXT NOT NULL,
+    row_num INTEGER NOT NULL,
+
+    PRIMARY KEY (announcement_id, school, role, row_num)
+);
+
+-- Entries created before the allocator existed
+INSERT INTO ride_row_counters (announcement_id, school, role, last_row)
+SELECT announcement_id, school, role, MAX(row_num)
+FROM ride_entries
+GROUP BY announcement_id, school, role
+ON CONFLICT DO NOTHING;
+
+-- ─────────────────────────────────────────────────────────────
+-- Performance Indexes
+-- ─────────────────────────────────────────────────────────────
+CREATE INDEX IF NOT EXISTS idx_announcements_state_send
+    ON announcements (state, send_at);
+
+CREATE INDEX IF NOT EXISTS idx_announcements_end_at
+    ON announcements (end_at);
+
+CREATE INDEX IF NOT EXISTS idx_ride_entries_announcement
+    ON ride_entries (announcement_id);
+
+-- ─────────────────────────────────────────────────────────────
+-- Saved Information
+-- ─────────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS saved_info (
+    -- Discord user ID (snowflake)
+    user_id BIGINT NOT NULL,
+
+    role TEXT NOT NULL,
+
+    -- Only meaningful for drivers
+    seats INTEGER CHECK (seats >= 0),
+
+    phone TEXT NOT NULL,
+
+    PRIMARY KEY (user_id)
+);
+
+-- ─────────────────────────────────────────────────────────────
+-- Google Sheets Outbox
+-- Pending sheet operations, delivered in id order per announcement
+-- ─────────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS sheet_outbox (
+    id BIGSERIAL PRIMARY KEY,
+
+    announcement_id UUID NOT NULL
+        REFERENCES announcements(id)
+        ON DELETE CASCADE,
+
+    -- add | delete | reset
+    action TEXT NOT NULL CHECK (action IN ('add', 'delete', 'reset')),
+    payload JSONB NOT NULL,
+
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sheet_outbox_announcement
+    ON sheet_outbox (announcement_id, id);
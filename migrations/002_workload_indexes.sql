@@ -0,0 +1,30 @@
+-- migrate: no-transaction
+-- ─────────────────────────────────────────────────────────────
+-- Workload-tuned indexes
+-- Built CONCURRENTLY so signups keep writing ride_entries meanwhile
+-- ─────────────────────────────────────────────────────────────
+
+-- Dashboard rosters / totals and the export read an announcement's
+-- entries grouped by school and role in row order; this serves them
+-- presorted, and the roster query (user_id, seats) from the index alone
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ride_entries_roster
+    ON ride_entries (announcement_id, school, role, row_num)
+    INCLUDE (user_id, seats);
+
+-- Same leading column as the (announcement_id, user_id) primary key,
+-- which already serves every lookup this one did
+DROP INDEX CONCURRENTLY IF EXISTS idx_ride_entries_announcement;
+
+-- The scheduler only looks for sends among scheduled announcements
+-- and closes among sent ones; closed announcements, the bulk of the
+-- table until purged, stay out of both
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_scheduled_send
+    ON announcements (send_at)
+    WHERE state = 'scheduled';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_announcements_sent_end
+    ON announcements (end_at)
+    WHERE state = 'sent';
+
+-- Replaced by idx_announcements_scheduled_send
+DROP INDEX CONCURRENTLY IF EXISTS idx_announcements_state_send;
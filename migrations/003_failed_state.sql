@@ -0,0 +1,9 @@
+-- ─────────────────────────────────────────────────────────────
+-- Failed announcements
+-- Announcements Discord refused to post (e.g. content over its
+-- 2000-character limit) leave the scheduler as 'failed' instead of
+-- being retried forever
+-- ─────────────────────────────────────────────────────────────
+ALTER TABLE announcements DROP CONSTRAINT IF EXISTS announcements_state_check;
+ALTER TABLE announcements ADD CONSTRAINT announcements_state_check
+    CHECK (state IN ('scheduled', 'sent', 'closed', 'failed'));
@@ -0,0 +1,246 @@
+import os
+import json
+import asyncio
+import weakref
+from datetime import timedelta
+from db import execute, fetchall, fetchone
+from exporter import post_to_sheets, batch_payload, CircuitOpenError, on_breaker_change, breaker_retry_after
+from time_utils import now
+from dotenv import load_dotenv
+load_dotenv()
+
+OUTBOX_BATCH_SIZE = 200  # operations read per announcement per pass
+SHEETS_BATCH_SIZE = 50  # operations sent per Apps Script request
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))  # announcements delivered in parallel
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+BACKOFF_BASE = 2  # seconds, doubled on every failed attempt
+BACKOFF_MAX = 600  # seconds
+IDLE_SLEEP = 60  # seconds, resync when nothing is pending
+RETRY_INTERVAL = 5  # seconds, backoff after a failed pass
+PROBE_WAIT = 1  # seconds, wait while another caller holds the half-open probe
+
+_wakeup = asyncio.Event()
+_stats = {"delivered": 0, "retried": 0, "dropped": 0, "deferred": 0, "last_lag": 0.0, "max_lag": 0.0}
+_delivery_locks = weakref.WeakValueDictionary()
+
+
+# Resume delivery as soon as the Sheets circuit closes again
+def _on_breaker_change(old, new):
+    if new == "closed":
+        _wakeup.set()
+
+
+on_breaker_change(_on_breaker_change)
+
+
+# ─────────────────────────────────────────────────────────────
+# Google Sheets Outbox
+# Sheet operations (add / delete / reset) are written to the
+# sheet_outbox table and delivered by a background worker, so users
+# only wait on the Postgres write. Failed deliveries retry with
+# exponential backoff; operations for the same announcement are
+# always delivered in the order they were queued, grouped into
+# batch requests of up to SHEETS_BATCH_SIZE operations.
+# ─────────────────────────────────────────────────────────────
+async def enqueue_sheet_op(payload):
+    await execute(
+        """
+        INSERT INTO sheet_outbox (announcement_id, action, payload)
+        VALUES ($1, $2, $3)
+        """,
+        (payload["announcement_id"], payload["action"], json.dumps(payload)),
+        name="outbox.enqueue"
+    )
+    wake_outbox()
+
+
+# For statements that insert into sheet_outbox themselves (signups and
+# withdrawals queue their op in the same transaction as the row change)
+def wake_outbox():
+    _wakeup.set()
+
+
+# Held while an announcement's operations are delivered; reconcile takes
+# it too, so a bulk replace never interleaves with them
+def delivery_lock(announcement_id) -> asyncio.Lock:
+    lock = _delivery_locks.get(announcement_id)
+    if lock is None:
+        lock = _delivery_locks[announcement_id] = asyncio.Lock()
+    return lock
+
+
+# ─────────────────────────────────────────────────────────────
+# Outbox worker loop
+# ─────────────────────────────────────────────────────────────
+async def outbox_loop(bot):
+    await bot.wait_until_ready()
+    print("[outbox] started")
+
+    while not bot.is_closed():
+        # Cleared before reading so an enqueue during the pass is not lost
+        _wakeup.clear()
+        try:
+            delay = await deliver_pending()
+        except Exception as e:
+            print(f"[outbox] error: {e}")
+            delay = RETRY_INTERVAL
+
+        if delay <= 0:
+            continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ─────────────────────────────────────────────────────────────
+# Delivers every pending operation whose announcement is not backing off
+# Returns how long to sleep before the next pass (0 = run again now)
+# While the Sheets circuit is open, sleeps until it may probe again
+# ─────────────────────────────────────────────────────────────
+async def deliver_pending() -> float:
+    retry_after = breaker_retry_after()
+    if retry_after > 0:
+        return retry_after
+
+    # Backoff is tracked on each announcement's oldest op, so only the
+    # heads decide which chains are due; a long chain in backoff cannot
+    # crowd the others out of the read below. A head held at infinity
+    # (a reset waiting for its announcement to post) holds its chain.
+    heads = await fetchall(
+        """
+        SELECT announcement_id, next_attempt_at
+        FROM (
+            SELECT DISTINCT ON (announcement_id) announcement_id, next_attempt_at
+            FROM sheet_outbox
+            ORDER BY announcement_id, id
+        ) AS heads
+        WHERE next_attempt_at <> 'infinity'
+        """,
+        name="outbox.heads"
+    )
+
+    if not heads:
+        return IDLE_SLEEP
+
+    current = now()
+    due_ids = [head["announcement_id"] for head in heads if head["next_attempt_at"] <= current]
+    waiting = [head["next_attempt_at"] for head in heads if head["next_attempt_at"] > current]
+
+    rows = []
+    if due_ids:
+        rows = await fetchall(
+            """
+            SELECT id, announcement_id, payload, attempts, next_attempt_at, created_at
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY announcement_id ORDER BY id) AS position
+                FROM sheet_outbox
+                WHERE announcement_id = ANY($1::uuid[])
+            ) AS ops
+            WHERE position <= $2
+            ORDER BY announcement_id, id
+            """,
+            (due_ids, OUTBOX_BATCH_SIZE),
+            name="outbox.pending"
+        )
+
+    # Group by announcement, keeping queue order inside each group
+    chains = {}
+    for row in rows:
+        chains.setdefault(row["announcement_id"], []).append(row)
+    due = list(chains.values())
+
+    semaphore = asyncio.Semaphore(max(OUTBOX_CONCURRENCY, 1))
+
+    async def run(ops):
+        async with semaphore, delivery_lock(ops[0]["announcement_id"]):
+            return await deliver_chain(ops)
+
+    deferred = await asyncio.gather(*(run(ops) for ops in due))
+
+    # Nothing went out: the circuit opened during the pass, or another
+    # caller (reconcile) holds the half-open probe
+    if due and all(deferred):
+        return max(breaker_retry_after(), PROBE_WAIT)
+
+    # Anything attempted changes the backlog; re-read it before sleeping
+    if due:
+        return 0
+
+    return max((min(waiting) - now()).total_seconds(), 0.1)
+
+
+# Delivers one announcement's operations in order, one batch request
+# at a time, stopping at the first failed batch
+# Returns True if the circuit breaker deferred the chain
+async def deliver_chain(ops) -> bool:
+    for i in range(0, len(ops), SHEETS_BATCH_SIZE):
+        batch = ops[i:i + SHEETS_BATCH_SIZE]
+        head = batch[0]
+
+        try:
+            ok, text = await post_to_sheets(
+                batch_payload(json.loads(op["payload"]) for op in batch)
+            )
+        except CircuitOpenError:
+            # Not sent, so no attempt is used up; retried once the circuit allows
+            _stats["deferred"] += len(batch)
+            return True
+        except Exception as e:
+            ok, text = False, f"{type(e).__name__}: {e}"
+
+        if ok:
+            await execute(
+                "DELETE FROM sheet_outbox WHERE id = ANY($1::bigint[])",
+                ([op["id"] for op in batch],),
+                name="outbox.delivered"
+            )
+            current = now()
+            for op in batch:
+                lag = (current - op["created_at"]).total_seconds()
+                _stats["max_lag"] = max(_stats["max_lag"], lag)
+            _stats["last_lag"] = (current - head["created_at"]).total_seconds()
+            _stats["delivered"] += len(batch)
+            continue
+
+        # The batch is retried as a whole; attempts are tracked on its head
+        attempts = head["attempts"] + 1
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            await execute(
+                "DELETE FROM sheet_outbox WHERE id = ANY($1::bigint[])",
+                ([op["id"] for op in batch],),
+                name="outbox.dropped"
+            )
+            _stats["dropped"] += len(batch)
+            print(f"[outbox] dropped {len(batch)} operations for {head['announcement_id']} after {attempts} attempts: {text}")
+            continue
+
+        backoff = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+        await execute(
+            """
+            UPDATE sheet_outbox
+            SET attempts=$1, next_attempt_at=$2, last_error=$3
+            WHERE id=$4
+            """,
+            (attempts, now() + timedelta(seconds=backoff), text, head["id"]),
+            name="outbox.backoff"
+        )
+        _stats["retried"] += 1
+        print(f"[outbox] delivery failed for {head['announcement_id']} (attempt {attempts}): {text}")
+        break
+
+    return False
+
+
+# Returns delivery counters plus the current backlog and its age
+async def outbox_stats() -> dict:
+    row = await fetchone(
+        "SELECT COUNT(*), MIN(created_at) FROM sheet_outbox"
+    )
+    pending, oldest = row
+    return {
+        **_stats,
+        "pending": pending,
+        "oldest_age": (now() - oldest).total_seconds() if oldest else 0.0,
+    }
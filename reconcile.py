@@ -0,0 +1,105 @@
+import os
+import re
+import asyncio
+from db import fetchone, fetchall
+from exporter import post_to_sheets, replace_payload, sheet_grid
+from outbox import delivery_lock
+from dotenv import load_dotenv
+load_dotenv()
+
+RECONCILE_INTERVAL = int(os.getenv("SHEETS_RECONCILE_INTERVAL", "1800"))  # seconds
+
+_stats = {"runs": 0, "cells_fixed": 0, "skipped": 0, "failed": 0}
+
+
+# ─────────────────────────────────────────────────────────────
+# Google Sheets Reconciliation
+# Rebuilds an announcement's full sheet grid from ride_entries and
+# pushes it in one bulk write, repairing drift left by operations the
+# outbox gave up on. Skipped while the announcement still has queued
+# operations, so it never races ahead of the outbox. Holds the
+# announcement's delivery lock from that check to the write, so an
+# operation queued meanwhile is delivered after the replace instead of
+# being overwritten by it.
+# Returns (cells_differed, text); cells_differed is None if nothing
+# was applied.
+# ─────────────────────────────────────────────────────────────
+async def reconcile_announcement(bot, announcement_id):
+    async with delivery_lock(announcement_id):
+        return await _reconcile(bot, announcement_id)
+
+
+async def _reconcile(bot, announcement_id):
+    row = await fetchone(
+        """
+        SELECT a.content_category,
+               EXISTS (SELECT 1 FROM sheet_outbox o WHERE o.announcement_id = a.id)
+        FROM announcements a
+        WHERE a.id=$1
+        """,
+        (announcement_id,)
+    )
+    if not row:
+        return None, "Announcement not found."
+
+    content_category, pending = row
+    if pending:
+        _stats["skipped"] += 1
+        return None, "Sheet operations are still queued for this announcement; try again shortly."
+
+    grid = await sheet_grid(bot, announcement_id)
+
+    try:
+        ok, text = await post_to_sheets(
+            replace_payload(announcement_id, content_category or "F", grid)
+        )
+    except Exception as e:
+        ok, text = False, f"{type(e).__name__}: {e}"
+
+    match = re.search(r"(\d+) cells differed", text) if ok else None
+    if not match:
+        _stats["failed" if not ok else "skipped"] += 1
+        return None, text
+
+    differed = int(match.group(1))
+    _stats["runs"] += 1
+    _stats["cells_fixed"] += differed
+    return differed, text
+
+
+# ─────────────────────────────────────────────────────────────
+# Scheduled reconcile
+# Every RECONCILE_INTERVAL seconds, reconciles the announcement each
+# sheet is currently tracking (the latest sent one per category)
+# ─────────────────────────────────────────────────────────────
+async def reconcile_loop(bot):
+    await bot.wait_until_ready()
+    print("[reconcile] started")
+
+    while not bot.is_closed():
+        await asyncio.sleep(RECONCILE_INTERVAL)
+
+        try:
+            rows = await fetchall(
+                """
+                SELECT DISTINCT ON (content_category) id
+                FROM announcements
+                WHERE state IN ('sent', 'closed')
+                  AND content_category IS NOT NULL
+                ORDER BY content_category, send_at DESC
+                """
+            )
+
+            for (announcement_id,) in rows:
+                differed, text = await reconcile_announcement(bot, announcement_id)
+                if differed:
+                    print(f"[reconcile] {announcement_id}: fixed {differed} cells")
+                elif differed is None:
+                    print(f"[reconcile] {announcement_id}: not applied: {text}")
+        except Exception as e:
+            print(f"[reconcile] error: {e}")
+
+
+# Returns reconcile counters (cells_fixed is summed over all runs)
+def reconcile_stats() -> dict:
+    return dict(_stats)
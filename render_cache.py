@@ -0,0 +1,48 @@
+from collections import OrderedDict
+
+
+# ─────────────────────────────────────────────────────────────
+# Versioned Cache
+# Holds one value per key (e.g. an announcement's dashboard snapshot
+# or export file) tagged with the announcement's version counter.
+# A lookup with any other version is a miss, so signups, withdrawals
+# and edits invalidate entries without explicit purges. Entries are
+# evicted least-recently-used once their total size passes max_bytes.
+# ─────────────────────────────────────────────────────────────
+class VersionedCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (version, value, size), LRU order
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self._stats["misses"] += 1
+            return None
+
+        self._stats["hits"] += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, version, value, size):
+        self.discard(key)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (version, value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self._stats["evictions"] += 1
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    # Returns hit/miss/eviction counters and current usage
+    def stats(self) -> dict:
+        return {**self._stats, "entries": len(self._entries), "bytes": self._bytes}
@@ -0,0 +1,92 @@
+# ─────────────────────────────────────────────────────────────
+# Channel / Message Resolver
+# Shared by the scheduler, views and dashboard.
+# Caches channel objects and hands out partial messages so that
+# edits and deletes skip the fetch_message REST call.
+# Also remembers a hash of what each message last showed so that
+# no-op edits can be skipped entirely.
+# ─────────────────────────────────────────────────────────────
+import hashlib
+import json
+
+_channels = {}
+_rendered = {}  # message_id -> hash of the last content/embed/view sent
+_stats = {"hits": 0, "misses": 0, "edits_applied": 0, "edits_skipped": 0}
+
+
+# Returns the channel for channel_id, or None if it cannot be resolved
+async def get_channel(bot, channel_id):
+    channel = _channels.get(channel_id)
+    if channel is not None:
+        _stats["hits"] += 1
+        return channel
+
+    _stats["misses"] += 1
+    channel = bot.get_channel(channel_id)
+    if channel is None:
+        try:
+            channel = await bot.fetch_channel(channel_id)
+        except Exception:
+            return None
+
+    _channels[channel_id] = channel
+    return channel
+
+
+# Returns a PartialMessage that can be edited/deleted without fetching it first
+async def get_message(bot, channel_id, message_id):
+    if not message_id:
+        return None
+
+    channel = await get_channel(bot, channel_id)
+    if channel is None:
+        return None
+
+    return channel.get_partial_message(message_id)
+
+
+# Hashes the parts of a message the bot controls
+def render_hash(content=None, embed=None, view=None) -> str:
+    payload = {
+        "content": content,
+        "embed": embed.to_dict() if embed else None,
+        "view": view.to_components() if view else None,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# Records what a message currently shows (e.g. after an interaction edit)
+def remember_render(message_id, content=None, embed=None, view=None):
+    _rendered[message_id] = render_hash(content, embed, view)
+
+
+def forget_message(message_id):
+    _rendered.pop(message_id, None)
+
+
+# Edits message unless it already shows exactly this output
+# Returns True if an edit was sent
+async def edit_if_changed(message, content=None, embed=None, view=None) -> bool:
+    digest = render_hash(content, embed, view)
+    if _rendered.get(message.id) == digest:
+        _stats["edits_skipped"] += 1
+        return False
+
+    kwargs = {}
+    if content is not None:
+        kwargs["content"] = content
+    if embed is not None:
+        kwargs["embed"] = embed
+    if view is not None:
+        kwargs["view"] = view
+
+    await message.edit(**kwargs)
+    _rendered[message.id] = digest
+    _stats["edits_applied"] += 1
+    return True
+
+
+# Returns hit/miss counters for the channel cache and edit skip counters
+def resolver_stats() -> dict:
+    return dict(_stats)
@@ -1,17 +1,140 @@
 import os
+import json
 import asyncio
+import heapq
+import discord
+from datetime import timedelta
 from db import fetchall, execute, fetchone
 from time_utils import now, get_cutoff_datetime, format_close_time
 from views import RideView
-from exporter import trigger_sheet_reset
-from dashboard import render_dashboard, refresh_dashboard_for_announcement
+from exporter import reset_payload
+from outbox import wake_outbox
+from dashboard import refresh_dashboard_for_announcement
+from dashboard_snapshot import load_snapshot
 from dashboard_paginator import DashboardPaginator
+from resolver import get_channel, edit_if_changed, forget_message
 from dotenv import load_dotenv
 load_dotenv()
 
 PUBLIC_CHANNEL_ID = int(os.getenv("PUBLIC_CHANNEL_ID"))
 ADMIN_CHANNEL_ID = int(os.getenv("ADMIN_CHANNEL_ID"))
-REFRESH_INTERVAL = 1  # seconds
+PURGE_AFTER_DAYS = 180
+MAX_SLEEP = 3600  # seconds, periodic resync with the database
+RETRY_INTERVAL = 5  # seconds, backoff after a failed pass
+DISPATCH_CONCURRENCY = int(os.getenv("DISPATCH_CONCURRENCY", "5"))  # 1 = serial
+PURGE_CHUNK_SIZE = 25  # announcements deleted per DB round-trip
+IDLE_POLL_INTERVAL = 0.1  # seconds, how often the purge worker re-checks for due work
+PURGE_RETRY_INTERVAL = 300  # seconds, after a purge pass that deleted nothing or failed
+
+_purge_task = None
+_purge_retry_at = None  # earliest next purge after an empty or failed pass
+_FAILED = object()  # dispatch_concurrently marker for an item that raised
+
+
+# ─────────────────────────────────────────────────────────────
+# Deadline queue:
+# In-memory min-heap of upcoming send/close/purge deadlines
+# The scheduler sleeps until the earliest one, or until woken early
+# by a schedule change (create / edit / unschedule / delete)
+# ─────────────────────────────────────────────────────────────
+class DeadlineQueue:
+    def __init__(self):
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    # Signals the scheduler to reload deadlines from the database
+    def wake(self):
+        self._wakeup.set()
+
+    # Cleared before each reload so a wake during the load is not lost
+    def clear_wakeup(self):
+        self._wakeup.clear()
+
+    # Replaces the heap with freshly loaded (when, announcement_id) pairs
+    def replace(self, entries):
+        self._heap = [(when, str(aid)) for when, aid in entries if when is not None]
+        heapq.heapify(self._heap)
+
+    def next_deadline(self):
+        return self._heap[0][0] if self._heap else None
+
+    def has_due(self) -> bool:
+        return bool(self._heap) and self._heap[0][0] <= now()
+
+    # Marks whether the send/close path is currently running
+    def set_dispatching(self, active: bool):
+        if active:
+            self._idle.clear()
+        else:
+            self._idle.set()
+
+    # Lets background work (purging) yield while anything is due or dispatching
+    async def wait_idle(self):
+        while self.has_due() or not self._idle.is_set():
+            await asyncio.sleep(IDLE_POLL_INTERVAL)
+
+    # Pops every deadline that has passed, returns the announcement ids
+    def pop_due(self) -> list:
+        due = []
+        current = now()
+        while self._heap and self._heap[0][0] <= current:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    # Sleeps until the next deadline, an early wake, or MAX_SLEEP
+    async def wait(self):
+        deadline = self.next_deadline()
+        timeout = MAX_SLEEP
+        if deadline is not None:
+            timeout = min(max((deadline - now()).total_seconds(), 0), MAX_SLEEP)
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ─────────────────────────────────────────────────────────────
+# Loads upcoming deadlines into the queue:
+# send_at of scheduled, end_at of sent, and the oldest purge cutoff
+# (skipped while the purge worker is already running)
+# ─────────────────────────────────────────────────────────────
+async def load_deadlines(queue: DeadlineQueue):
+    queue.clear_wakeup()
+    include_purge = _purge_task is None or _purge_task.done()
+
+    rows = await fetchall(
+        """
+        SELECT send_at, id, false FROM announcements
+        WHERE state='scheduled'
+        UNION ALL
+        SELECT end_at, id, false FROM announcements
+        WHERE state='sent' AND end_at IS NOT NULL
+        UNION ALL
+        (
+            SELECT end_at, id, true FROM announcements
+            WHERE end_at IS NOT NULL
+              AND $1::boolean
+            ORDER BY end_at
+            LIMIT 1
+        )
+        """,
+        (include_purge,)
+    )
+
+    # The purge deadline is added here with the same arithmetic as
+    # get_cutoff_datetime; an SQL interval would follow the session's
+    # TimeZone across DST and could fall before the worker's cutoff
+    entries = []
+    for when, aid, purge in rows:
+        if purge:
+            when += timedelta(days=PURGE_AFTER_DAYS)
+            if _purge_retry_at is not None:
+                when = max(when, _purge_retry_at)
+        entries.append((when, aid))
+    queue.replace(entries)
 
 
 # ─────────────────────────────────────────────────────────────
@@ -21,29 +144,71 @@ async def scheduler_loop(bot):
     await bot.wait_until_ready()
     print("[scheduler] started")
 
+    queue = bot.deadlines
+
     while not bot.is_closed():
         try:
-            sent_announcement_ids = await send_scheduled_announcements(bot)
-            closed_announcement_ids = await close_expired_announcements(bot)
-            for aid in sent_announcement_ids:
-                await refresh_dashboard_for_announcement(bot, aid)
-            for aid in closed_announcement_ids:
-                await refresh_dashboard_for_announcement(bot, aid)
-            await purge_old_announcements(bot)
+            await load_deadlines(queue)
+            await queue.wait()
+
+            # Woken early or periodic resync: reload and sleep again
+            if not queue.pop_due():
+                continue
+
+            queue.set_dispatching(True)
+            try:
+                sent_announcement_ids, send_failures = await send_scheduled_announcements(bot)
+                closed_announcement_ids, close_failures = await close_expired_announcements(bot)
+                await dispatch_concurrently(
+                    [(aid,) for aid in sent_announcement_ids + closed_announcement_ids],
+                    lambda aid: refresh_dashboard_for_announcement(bot, aid),
+                )
+            finally:
+                queue.set_dispatching(False)
+
+            start_purge_worker(bot)
+
+            # Failed rows keep their past deadline and would be reloaded
+            # as due at once; wait before the next attempt
+            if send_failures or close_failures:
+                print(f"[scheduler] {send_failures + close_failures} failed, retrying in {RETRY_INTERVAL}s")
+                await asyncio.sleep(RETRY_INTERVAL)
         except Exception as e:
             print(f"[scheduler] error: {e}")
+            await asyncio.sleep(RETRY_INTERVAL)
 
-        await asyncio.sleep(REFRESH_INTERVAL)
+
+# ─────────────────────────────────────────────────────────────
+# Bounded fan-out:
+# Runs handler(*item) for every item with at most DISPATCH_CONCURRENCY
+# in flight. A failing item is logged and skipped without affecting
+# the others. Returns the non-None results in input order and the
+# number of items that failed.
+# ─────────────────────────────────────────────────────────────
+async def dispatch_concurrently(items, handler) -> tuple:
+    semaphore = asyncio.Semaphore(max(DISPATCH_CONCURRENCY, 1))
+
+    async def run(item):
+        async with semaphore:
+            try:
+                return await handler(*item)
+            except Exception as e:
+                print(f"[scheduler] dispatch error for {item[0]}: {e}")
+                return _FAILED
+
+    results = await asyncio.gather(*(run(item) for item in items))
+    done = [result for result in results if result is not None and result is not _FAILED]
+    return done, sum(result is _FAILED for result in results)
 
 
 # ─────────────────────────────────────────────────────────────
 # Sends scheduled announcements:
-# Returns list of sent announcement ids
+# Returns list of sent announcement ids and the number that failed
 # ─────────────────────────────────────────────────────────────
-async def send_scheduled_announcements(bot) -> list:
+async def send_scheduled_announcements(bot) -> tuple:
     rows = await fetchall(
         """
-        SELECT id, title, content, reactable, end_at, content_category
+        SELECT id, title, content, reactable, end_at, content_category, version
         FROM announcements
         WHERE state='scheduled'
           AND send_at <= $1
@@ -52,24 +217,16 @@ async def send_scheduled_announcements(bot) -> list:
     )
 
     if not rows:
-        return []
+        return [], 0
 
-    public_ch = bot.get_channel(PUBLIC_CHANNEL_ID)
+    public_ch = await get_channel(bot, PUBLIC_CHANNEL_ID)
     if not public_ch:
-        try:
-            public_ch = await bot.fetch_channel(PUBLIC_CHANNEL_ID)
-        except Exception:
-            return
+        print("[scheduler] public channel unavailable, nothing sent")
+        return [], len(rows)
 
-    admin_ch = bot.get_channel(ADMIN_CHANNEL_ID)
-    if not admin_ch:
-        try:
-            admin_ch = await bot.fetch_channel(ADMIN_CHANNEL_ID)
-        except Exception:
-            admin_ch = None
+    admin_ch = await get_channel(bot, ADMIN_CHANNEL_ID)
 
-    sent_announcement_ids = []
-    for announcement_id, title, content, reactable, end_at, content_category in rows:
+    async def send_one(announcement_id, title, content, reactable, end_at, content_category, version):
         view = RideView(announcement_id, False) if reactable else None
 
         if reactable:
@@ -79,49 +236,117 @@ async def send_scheduled_announcements(bot) -> list:
 
         message_text = f"{header}\n\n{content}"
 
-        msg = await public_ch.send(message_text, view=view)
-
-        dashboard_msg_id = None
-        if reactable and admin_ch:
-            dashboard_msg_id = await create_dashboard(
-                bot=bot,
-                announcement_id=announcement_id,
-                title=title,
-                end_at=end_at,
-                admin_ch=admin_ch,
+        # Queued once, before the post, so no signup's add can precede it,
+        # but held (next_attempt_at = infinity) until the post succeeds:
+        # the sheet must never switch to an announcement that is not up
+        if reactable:
+            await execute(
+                """
+                INSERT INTO sheet_outbox (announcement_id, action, payload, next_attempt_at)
+                SELECT $1::uuid, 'reset', $2::jsonb, 'infinity'
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM sheet_outbox
+                    WHERE announcement_id=$1 AND action='reset'
+                )
+                """,
+                (announcement_id, json.dumps(reset_payload(announcement_id, content_category))),
+                name="scheduler.hold_reset"
             )
 
-            await trigger_sheet_reset(announcement_id, content_category)
-            
+        try:
+            msg = await public_ch.send(message_text, view=view)
+        except discord.HTTPException as e:
+            # Discord refused the message itself (e.g. content over 2000
+            # characters); every retry would fail the same way
+            if 400 <= e.status < 500 and e.status != 429:
+                await fail_announcement(admin_ch, announcement_id, title, e)
+                return None
+            raise
+
+        # Marked sent as soon as the message exists, so a failure below
+        # can never make a retry post it twice; releases the held reset
         await execute(
             """
+            WITH released AS (
+                UPDATE sheet_outbox
+                SET next_attempt_at=NOW()
+                WHERE announcement_id=$2 AND action='reset'
+            )
             UPDATE announcements
             SET state='sent',
                 message_id=$1,
-                dashboard_message_id=$2,
                 dashboard_page=0
-            WHERE id=$3
+            WHERE id=$2
             """,
-            (msg.id, dashboard_msg_id, announcement_id)
+            (msg.id, announcement_id)
         )
-        sent_announcement_ids.append(announcement_id)
-    return sent_announcement_ids
+        if reactable:
+            wake_outbox()
+
+        if reactable and admin_ch:
+            try:
+                dashboard_msg_id = await create_dashboard(
+                    bot=bot,
+                    announcement_id=announcement_id,
+                    title=title,
+                    end_at=end_at,
+                    version=version,
+                    admin_ch=admin_ch,
+                )
+                await execute(
+                    "UPDATE announcements SET dashboard_message_id=$1 WHERE id=$2",
+                    (dashboard_msg_id, announcement_id)
+                )
+            except Exception as e:
+                print(f"[scheduler] dashboard not created for {announcement_id}: {e}")
+
+        return announcement_id
+
+    return await dispatch_concurrently(rows, send_one)
+
+# ─────────────────────────────────────────────────────────────
+# Takes an announcement Discord refused to post out of the schedule
+# (state 'failed'), drops its held sheet reset and tells the admins
+# ─────────────────────────────────────────────────────────────
+async def fail_announcement(admin_ch, announcement_id, title, error):
+    await execute(
+        """
+        WITH dropped AS (
+            DELETE FROM sheet_outbox
+            WHERE announcement_id=$1 AND action='reset'
+        )
+        UPDATE announcements
+        SET state='failed'
+        WHERE id=$1
+        """,
+        (announcement_id,)
+    )
+    print(f"[scheduler] {announcement_id} rejected by Discord, not retrying: {error}")
+
+    if admin_ch:
+        try:
+            await admin_ch.send(
+                f"❌ **{title}** could not be posted and will not be retried: {error.text}\n"
+                f"Delete it with `/announcement_delete` ({announcement_id}) and create it again."
+            )
+        except Exception:
+            pass
+
 
 # ─────────────────────────────────────────────────────────────
 # Creates initial admin dashboard
 # ─────────────────────────────────────────────────────────────
-async def create_dashboard(bot, announcement_id, title, end_at, admin_ch):
-    embeds = await render_dashboard(
+async def create_dashboard(bot, announcement_id, title, end_at, version, admin_ch):
+    snapshot = await load_snapshot(
         bot=bot,
         announcement_id=announcement_id,
         title=title,
         end_at=end_at,
+        version=version,
     )
-    if not embeds:
-        return None
 
     view = DashboardPaginator(
-        embeds=embeds,
+        snapshot=snapshot,
         announcement_id=announcement_id,
         title=title,
         start_index=0,
@@ -137,96 +362,141 @@ async def create_dashboard(bot, announcement_id, title, end_at, admin_ch):
 
 # ─────────────────────────────────────────────────────────────
 # Closes expired announcements (state only)
-# Returns list of closed announcements
+# Returns list of closed announcements and the number that failed
 # ─────────────────────────────────────────────────────────────
-async def close_expired_announcements(bot) -> list:
+async def close_expired_announcements(bot) -> tuple:
+    public_ch = await get_channel(bot, PUBLIC_CHANNEL_ID)
+    if not public_ch:
+        print("[scheduler] public channel unavailable, nothing closed")
+        return [], 1
+
+    # Single atomic transition; the Discord edits are driven from its result
     rows = await fetchall(
         """
-        SELECT id, message_id, reactable
-        FROM announcements
+        UPDATE announcements
+        SET state='closed'
         WHERE state='sent'
           AND end_at IS NOT NULL
           AND end_at <= $1
+        RETURNING id, message_id, title, content, reactable
         """,
         (now(),)
     )
 
     if not rows:
-        return []
-
-    public_ch = bot.get_channel(PUBLIC_CHANNEL_ID)
-    if not public_ch:
-        try:
-            public_ch = await bot.fetch_channel(PUBLIC_CHANNEL_ID)
-        except Exception:
-            return []
-
-    closed_announcement_ids = []
-
-    for announcement_id, message_id, reactable in rows:
-        await execute(
-            "UPDATE announcements SET state='closed' WHERE id=$1",
-            (announcement_id,)
-        )
+        return [], 0
 
+    async def close_one(announcement_id, message_id, title, content, reactable):
         if reactable:
             try:
-                msg = await public_ch.fetch_message(message_id)
-                row = await fetchone(
-                    "SELECT title, content FROM announcements WHERE id=$1",
-                    (announcement_id,)
+                msg = public_ch.get_partial_message(message_id)
+                new_text = (
+                    f"**{title}**\n"
+                    "🔒 Requests for this announcement have closed. If you need to drop or request any necessary changes, please text in [#rides-logistics](https://discord.com/channels/1414800603686768676/1460658935001256028). \n\n"
+                    f"{content}"
+                )
+                await edit_if_changed(
+                    msg,
+                    content=new_text,
+                    view=RideView(announcement_id, is_closed=True)
                 )
-                if row:
-                    title, content = row
-                    new_text = (
-                        f"**{title}**\n"
-                        "🔒 Requests for this announcement have closed. If you need to drop or request any necessary changes, please text in [#rides-logistics](https://discord.com/channels/1414800603686768676/1460658935001256028). \n\n"
-                        f"{content}"
-                    )
-                    await msg.edit(
-                        content=new_text,
-                        view=RideView(announcement_id, is_closed=True)
-                    )
             except Exception:
                 pass
 
+        return announcement_id
 
-        closed_announcement_ids.append(announcement_id)
+    return await dispatch_concurrently(rows, close_one)
 
-    return closed_announcement_ids
+
+# ─────────────────────────────────────────────────────────────
+# Starts the background purge worker unless one is already running
+# ─────────────────────────────────────────────────────────────
+def start_purge_worker(bot):
+    global _purge_task
+    if _purge_task is None or _purge_task.done():
+        _purge_task = asyncio.create_task(purge_old_announcements(bot))
 
 
 # ─────────────────────────────────────────────────────────────
-# Permanently deletes all expired announcements older than 180 days
-# Deletes from database and Discord channels
+# Permanently deletes all expired announcements older than PURGE_AFTER_DAYS
+# Deletes from Discord channels, then the database, in PURGE_CHUNK_SIZE
+# chunks, yielding to the send/close path before every chunk and message
 # ─────────────────────────────────────────────────────────────
 async def purge_old_announcements(bot):
-    rows = await fetchall(
-        """
-        SELECT id
-        FROM announcements
-        WHERE end_at IS NOT NULL
-          AND end_at <= $1
-        """,
-        (get_cutoff_datetime(days=180),)
-    )
-    for (announcement_id,) in rows:
-        success = await delete_announcement(bot, announcement_id)
-        if success:
-            print(f"[scheduler] purged announcement {announcement_id}")
+    global _purge_retry_at
+    queue = bot.deadlines
+    purged = 0
+
+    try:
+        public_ch = await get_channel(bot, PUBLIC_CHANNEL_ID)
+        admin_ch = await get_channel(bot, ADMIN_CHANNEL_ID)
+
+        while True:
+            await queue.wait_idle()
+
+            rows = await fetchall(
+                """
+                SELECT id, message_id, dashboard_message_id
+                FROM announcements
+                WHERE end_at IS NOT NULL
+                  AND end_at <= $1
+                ORDER BY end_at
+                LIMIT $2
+                """,
+                (get_cutoff_datetime(days=PURGE_AFTER_DAYS), PURGE_CHUNK_SIZE)
+            )
+
+            if not rows:
+                break
+
+            # Messages go first, so a crash mid-chunk leaves rows to retry
+            # rather than Discord messages nothing points at any more
+            for announcement_id, message_id, dashboard_msg_id in rows:
+                await queue.wait_idle()
+                await delete_message_by_id(public_ch, message_id)
+                await delete_message_by_id(admin_ch, dashboard_msg_id)
+
+            # ride_entries rows go with their announcement (ON DELETE CASCADE)
+            await execute(
+                "DELETE FROM announcements WHERE id = ANY($1::uuid[])",
+                ([row["id"] for row in rows],)
+            )
+            for row in rows:
+                print(f"[scheduler] purged announcement {row['id']}")
+            purged += len(rows)
+    except Exception as e:
+        print(f"[scheduler] purge error: {e}")
+    finally:
+        # A pass that deleted nothing would see the same deadline as due
+        # again at once; hold the next one back instead
+        _purge_retry_at = None if purged else now() + timedelta(seconds=PURGE_RETRY_INTERVAL)
+
+        # Lets the scheduler pick up the next purge deadline
+        queue.wake()
+
+
+# ─────────────────────────────────────────────────────────────
+# Deletes a Discord message by ID without fetching it first
+# ─────────────────────────────────────────────────────────────
+async def delete_message_by_id(channel, message_id):
+    if not channel or not message_id:
+        return
+
+    forget_message(message_id)
+    try:
+        await channel.get_partial_message(message_id).delete()
+    except Exception:
+        pass
 
 
 # ─────────────────────────────────────────────────────────────
 # Permanently deletes an announcement
-# Deletes from database and Discord channels
+# Deletes from Discord channels, then the database, so an interruption
+# never leaves a message (with working buttons) for a missing row
 # ─────────────────────────────────────────────────────────────
 async def delete_announcement(bot, announcement_id: str) -> bool:
     row = await fetchone(
-        """
-        SELECT message_id, dashboard_message_id
-        FROM announcements
-        WHERE id=$1
-        """,
+        "SELECT message_id, dashboard_message_id FROM announcements WHERE id=$1",
         (announcement_id,)
     )
 
@@ -237,46 +507,16 @@ async def delete_announcement(bot, announcement_id: str) -> bool:
 
     # ──────────────── Delete public message ────────────────
     if message_id:
-        public_ch = bot.get_channel(PUBLIC_CHANNEL_ID)
-        if not public_ch:
-            try:
-                public_ch = await bot.fetch_channel(PUBLIC_CHANNEL_ID)
-            except Exception:
-                public_ch = None
-
-        if public_ch:
-            try:
-                msg = await public_ch.fetch_message(message_id)
-                await msg.delete()
-            except Exception:
-                pass
+        await delete_message_by_id(await get_channel(bot, PUBLIC_CHANNEL_ID), message_id)
 
     # ──────────────── Delete admin dashboard ────────────────
     if dashboard_msg_id:
-        admin_ch = bot.get_channel(ADMIN_CHANNEL_ID)
-        if not admin_ch:
-            try:
-                admin_ch = await bot.fetch_channel(ADMIN_CHANNEL_ID)
-            except Exception:
-                admin_ch = None
-
-        if admin_ch:
-            try:
-                dash_msg = await admin_ch.fetch_message(dashboard_msg_id)
-                await dash_msg.delete()
-            except Exception:
-                pass
+        await delete_message_by_id(await get_channel(bot, ADMIN_CHANNEL_ID), dashboard_msg_id)
 
-    # ──────────────── Delete DB row ────────────────
+    # ──────────────── Delete DB row (and ride entries via cascade) ────────────────
     await execute(
         "DELETE FROM announcements WHERE id=$1",
         (announcement_id,)
     )
 
-    # ──────────────── Delete associated ride entries ────────────────
-    await execute(
-        "DELETE FROM ride_entries WHERE announcement_id=$1",
-        (announcement_id,)
-    )
-
     return True
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from types import SimpleNamespace
+from aiohttp import web
+
+SHEET_NAMES = {
+    "F": "Friday PM Imports",
+    "S": "Sunday Service Imports",
+}
+SCHOOLS = ["GT", "Emory", "GSU"]
+
+
+# ─────────────────────────────────────────────────────────────
+# Local Apps Script Stand-In
+# Mirrors the doPost semantics of googleappscript.js (reset, add,
+# delete, replace and batch, category -> sheet mapping, active
+# announcement memory) against an in-memory grid, with configurable
+# latency and error injection. Point the bot at it through GOOGLE_URL:
+#
+#   python sheets_standin.py serve --port 8765 --latency 0.3 --error-rate 0.05
+#   GOOGLE_URL=http://127.0.0.1:8765/exec python bot.py
+#
+# GET /grid?category=F returns the current sheet as TSV.
+# ─────────────────────────────────────────────────────────────
+class StandInSheets:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+        self.grids = {name: {} for name in SHEET_NAMES.values()}  # sheet -> {(row, col): value}
+        self.props = {}
+        self.requests = 0
+        self.range_writes = 0
+
+    # ──────────────── Apps Script semantics ────────────────
+    def apply(self, payload) -> str:
+        action = payload.get("action") or "add"
+
+        if action == "batch":
+            return self._apply_batch(payload.get("operations") or [])
+
+        sheet_name = SHEET_NAMES.get(payload.get("content_category"))
+        if not sheet_name:
+            return "Error: Invalid content category."
+
+        aid = payload.get("announcement_id")
+        memory_key = "active_aid_" + payload["content_category"]
+
+        if action == "reset":
+            self.grids[sheet_name].clear()
+            self.props[memory_key] = aid
+            return "✅ Sheet wiped and tracking new ID: " + str(aid)
+
+        saved_aid = self.props.get(memory_key)
+        if saved_aid and saved_aid != aid:
+            return "⚠️ Ignored: This announcement is no longer active."
+
+        if action == "replace":
+            return self._replace(sheet_name, payload.get("rows") or [])
+
+        row, col, values = cell_placement(payload)
+        self._write(sheet_name, row, col, values)
+        self.range_writes += 1
+
+        if action == "delete":
+            return "✅ Cleared row " + str(row)
+        return "✅ Success adding to row " + str(row)
+
+    def _apply_batch(self, operations) -> str:
+        applied = 0
+        skipped = []
+        touched = set()
+
+        for i, op in enumerate(operations):
+            action = op.get("action") or "add"
+            content = op.get("content_category")
+            sheet_name = SHEET_NAMES.get(content)
+            if not sheet_name:
+                skipped.append(f"{i}: no sheet for category {content}")
+                continue
+
+            memory_key = "active_aid_" + content
+            if action == "reset":
+                self.grids[sheet_name].clear()
+                self.props[memory_key] = op.get("announcement_id")
+                touched.discard(sheet_name)
+                applied += 1
+                continue
+
+            saved_aid = self.props.get(memory_key)
+            if saved_aid and saved_aid != op.get("announcement_id"):
+                skipped.append(f"{i}: announcement no longer active")
+                continue
+
+            row, col, values = cell_placement(op)
+            self._write(sheet_name, row, col, values)
+            touched.add(sheet_name)
+            applied += 1
+
+        # The real script flushes each touched sheet with one range write
+        self.range_writes += len(touched)
+
+        result = f"✅ Batch applied {applied} operations"
+        if skipped:
+            result += " (skipped " + "; ".join(skipped) + ")"
+        return result
+
+    def _replace(self, sheet_name, rows) -> str:
+        grid = self.grids[sheet_name]
+        target = {
+            (r, c): value
+            for r, row in enumerate(rows, start=1)
+            for c, value in enumerate(row, start=1)
+            if value not in ("", None)
+        }
+
+        differed = sum(
+            1 for cell in set(grid) | set(target)
+            if str(grid.get(cell, "")) != str(target.get(cell, ""))
+        )
+        if differed:
+            self.grids[sheet_name] = target
+            self.range_writes += 1
+        return f"✅ Replaced grid, {differed} cells differed"
+
+    def _write(self, sheet_name, row, col, values):
+        grid = self.grids[sheet_name]
+        for offset, value in enumerate(values):
+            if value == "":
+                grid.pop((row, col + offset), None)
+            else:
+                grid[(row, col + offset)] = value
+
+    # Renders a sheet as TSV, rows/columns starting at 1 like Sheets
+    def grid_tsv(self, category) -> str:
+        grid = self.grids.get(SHEET_NAMES.get(category), {})
+        if not grid:
+            return ""
+
+        max_row = max(r for r, _ in grid)
+        max_col = max(c for _, c in grid)
+        return "".join(
+            "\t".join(str(grid.get((r, c), "")) for c in range(1, max_col + 1)) + "\n"
+            for r in range(1, max_row + 1)
+        )
+
+    # ──────────────── HTTP handlers ────────────────
+    async def handle_post(self, request):
+        self.requests += 1
+
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self.random.random() < self.error_rate:
+            if self.random.random() < 0.5:
+                return web.Response(status=500, text="Injected server error")
+            return web.Response(text="Apps Script Error: injected failure")
+
+        try:
+            payload = await request.json()
+            return web.Response(text=self.apply(payload))
+        except Exception as e:
+            return web.Response(text="Apps Script Error: " + str(e))
+
+    async def handle_grid(self, request):
+        return web.Response(text=self.grid_tsv(request.query.get("category", "F")))
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/exec", self.handle_post)
+        app.router.add_get("/grid", self.handle_grid)
+        return app
+
+
+# Same placement as cellPlacement() in googleappscript.js
+def cell_placement(payload):
+    try:
+        row = int(payload.get("count"))
+    except (TypeError, ValueError):
+        row = 1
+    row = max(row, 1)
+
+    school = payload.get("school")
+    school_index = SCHOOLS.index(school) if school in SCHOOLS else 0
+    start_index = school_index * 8
+
+    is_driver = str(payload.get("role", "")).lower() == "driver"
+    is_delete = payload.get("action") == "delete"
+
+    if is_driver:
+        values = ["", "", "", ""] if is_delete else [
+            payload.get("name"), payload.get("seats"), payload.get("phone"), payload.get("info")
+        ]
+    else:
+        values = ["", "", ""] if is_delete else [
+            payload.get("name"), payload.get("phone"), payload.get("info")
+        ]
+
+    return row, start_index + (1 if is_driver else 5), values
+
+
+# ─────────────────────────────────────────────────────────────
+# Exporter benchmark
+# Starts a stand-in on a local port, points exporter at it, and
+# pushes the same signups one request per operation and as batches.
+# Needs the bot's .env (exporter imports db, which reads DATABASE_URL).
+# ─────────────────────────────────────────────────────────────
+async def run_benchmark(args):
+    import exporter
+
+    standin = StandInSheets(args.latency, args.jitter, args.error_rate, seed=0)
+    runner = web.AppRunner(standin.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    exporter.GOOGLE_URL = f"http://127.0.0.1:{port}/exec"
+
+    aid = str(uuid.uuid4())
+    payloads = [exporter.reset_payload(aid, "F")] + [
+        exporter.add_payload(
+            member=SimpleNamespace(display_name=f"user{i:04d}"),
+            announcement_id=aid,
+            school=SCHOOLS[i % len(SCHOOLS)],
+            role="driver" if i % 5 == 0 else "rider",
+            seats=4 if i % 5 == 0 else None,
+            phone="9999999999",
+            info="",
+            count=i // len(SCHOOLS) + 1,
+            content_category="F",
+        )
+        for i in range(args.ops)
+    ]
+
+    async def timed(payload, latencies, failures):
+        started = time.perf_counter()
+        try:
+            ok, _ = await exporter.post_to_sheets(payload)
+        except Exception:
+            ok = False
+        latencies.append(time.perf_counter() - started)
+        if not ok:
+            failures.append(payload)
+
+    async def single():
+        await exporter.post_to_sheets(payloads[0])
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies, failures = [], []
+
+        async def one(payload):
+            async with semaphore:
+                await timed(payload, latencies, failures)
+
+        await asyncio.gather(*(one(p) for p in payloads[1:]))
+        return latencies, failures
+
+    async def batched():
+        latencies, failures = [], []
+        for i in range(0, len(payloads), args.batch_size):
+            await timed(exporter.batch_payload(payloads[i:i + args.batch_size]), latencies, failures)
+        return latencies, failures
+
+    try:
+        for name, mode in (("single", single), ("batch", batched)):
+            standin.requests = standin.range_writes = 0
+            started = time.perf_counter()
+            latencies, failures = await mode()
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] if latencies else 0
+            p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+            print(
+                f"{name:>6}: {args.ops} ops in {elapsed:.2f}s "
+                f"({args.ops / elapsed:.1f} ops/s), {standin.requests} requests, "
+                f"{standin.range_writes} range writes, p50 {p50 * 1000:.0f}ms, "
+                f"p95 {p95 * 1000:.0f}ms, {len(failures)} failed requests"
+            )
+    finally:
+        await exporter.close_session()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Journey Rides Apps Script")
+    parser.add_argument("command", choices=["serve", "bench"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, 0..jitter seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--ops", type=int, default=300, help="bench: signups to push")
+    parser.add_argument("--concurrency", type=int, default=10, help="bench: parallel single-op requests")
+    parser.add_argument("--batch-size", type=int, default=50, help="bench: operations per batch request")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        standin = StandInSheets(args.latency, args.jitter, args.error_rate)
+        print(f"[standin] GOOGLE_URL=http://{args.host}:{args.port}/exec")
+        web.run_app(standin.make_app(), host=args.host, port=args.port, print=None)
+    else:
+        asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import asyncio
+import json
 import os
+import uuid
 import discord
 from db import execute, fetchone
-from exporter import remove_from_sheets, sync_to_sheets
+from exporter import add_payload, delete_payload
+from outbox import wake_outbox
 from time_utils import format_close_time, now
-from dashboard import refresh_dashboard_for_announcement
+from dashboard import request_dashboard_refresh
+from resolver import get_channel, get_message, edit_if_changed
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -28,16 +32,151 @@ def get_school(member) -> str:
             return school
     return None
 
-async def is_registered(announcement_id, user_id) -> bool:
+# Whether the user is already registered, plus their saved defaults,
+# in one round trip
+async def load_signup_state(announcement_id, user_id):
+    return await fetchone(
+        """
+        SELECT
+            EXISTS (
+                SELECT 1
+                FROM ride_entries
+                WHERE announcement_id=$1 AND user_id=$2
+            ) AS registered,
+            s.seats,
+            s.phone
+        FROM (SELECT 1) AS one
+        LEFT JOIN saved_info s ON s.user_id = $2
+        """,
+        (announcement_id, user_id),
+        name="signup.state"
+    )
+
+# ─────────────────────────────────────────────────────────────
+# Registers a driver/rider in a single statement (one transaction):
+# takes the lowest freed sheet row for the school/role or the next one
+# from its counter, inserts the entry, upserts saved_info, bumps the
+# announcement's version and queues the sheet add. Returns row_num.
+# The freed-row lookup is a scalar subquery (=, not IN) so it runs
+# once; as an IN semi-join, concurrent signups could claim several.
+# Queuing the add here, like the delete in withdraw, keeps sheet ops
+# for a reused row in the order the row changed hands.
+# ─────────────────────────────────────────────────────────────
+async def register_entry(announcement_id, member, school, role, seats, phone, info):
+    # Row and sheet are filled in by the statement
+    payload = add_payload(member, announcement_id, school, role, seats, phone, info, "", "")
+
     row = await fetchone(
         """
-        SELECT 1
-        FROM ride_entries
-        WHERE announcement_id=$1 AND user_id=$2
+        WITH reused AS (
+            DELETE FROM ride_free_rows
+            WHERE (announcement_id, school, role, row_num) = (
+                SELECT announcement_id, school, role, row_num
+                FROM ride_free_rows
+                WHERE announcement_id = $1
+                  AND school = $3
+                  AND role = $4
+                ORDER BY row_num
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING row_num
+        ), fresh AS (
+            INSERT INTO ride_row_counters (announcement_id, school, role, last_row)
+            SELECT $1, $3, $4, 1
+            WHERE NOT EXISTS (SELECT 1 FROM reused)
+            ON CONFLICT (announcement_id, school, role)
+            DO UPDATE SET last_row = ride_row_counters.last_row + 1
+            RETURNING last_row
+        ), entry AS (
+            INSERT INTO ride_entries (
+                announcement_id, user_id, school, role, seats, updated_at, phone, info, row_num
+            )
+            VALUES (
+                $1, $2, $3, $4, $5, NOW(), $6, $7,
+                COALESCE((SELECT row_num FROM reused), (SELECT last_row FROM fresh))
+            )
+            RETURNING row_num
+        ), saved AS (
+            INSERT INTO saved_info (user_id, role, seats, phone)
+            SELECT $2, $4, $5, $6 FROM entry
+            ON CONFLICT (user_id)
+            DO UPDATE SET
+                role = EXCLUDED.role,
+                seats = COALESCE(EXCLUDED.seats, saved_info.seats),
+                phone = EXCLUDED.phone
+        ), bumped AS (
+            UPDATE announcements SET version = version + 1
+            WHERE id = $1 AND EXISTS (SELECT 1 FROM entry)
+            RETURNING content_category, reactable
+        ), queued AS (
+            INSERT INTO sheet_outbox (announcement_id, action, payload)
+            SELECT $1, 'add', $8::jsonb || jsonb_build_object(
+                'count', entry.row_num::text,
+                'content_category', COALESCE(CASE WHEN bumped.reactable THEN bumped.content_category END, 'F')
+            )
+            FROM entry
+            LEFT JOIN bumped ON TRUE
+        )
+        SELECT row_num FROM entry
+        """,
+        (announcement_id, member.id, school, role, seats, phone, info, json.dumps(payload)),
+        name="signup.register"
+    )
+    wake_outbox()
+    return row
+
+# ─────────────────────────────────────────────────────────────
+# Withdraws a driver/rider in a single statement (one transaction):
+# deletes the entry, frees its sheet row for reuse, bumps the
+# announcement's version and queues the sheet delete. The delete is
+# queued in the same transaction as the freed row, so it always
+# precedes the add of a later signup that reuses the row.
+# Returns school, role, seats and content_category, or None.
+# ─────────────────────────────────────────────────────────────
+async def withdraw_entry(announcement_id, member):
+    # Entry fields are filled in from the removed row
+    payload = delete_payload(member, announcement_id, "", "", None, "", "", "", "")
+
+    row = await fetchone(
+        """
+        WITH removed AS (
+            DELETE FROM ride_entries
+            WHERE user_id=$1 AND announcement_id=$2
+            RETURNING school, role, seats, phone, info, row_num
+        ), freed AS (
+            INSERT INTO ride_free_rows (announcement_id, school, role, row_num)
+            SELECT $2, school, role, row_num FROM removed
+            ON CONFLICT DO NOTHING
+        ), bumped AS (
+            UPDATE announcements SET version = version + 1
+            WHERE id = $2 AND EXISTS (SELECT 1 FROM removed)
+            RETURNING content_category
+        ), queued AS (
+            INSERT INTO sheet_outbox (announcement_id, action, payload)
+            SELECT $2, 'delete', $3::jsonb || jsonb_build_object(
+                'school', removed.school,
+                'role', removed.role,
+                'seats', COALESCE(NULLIF(removed.seats, 0)::text, ''),
+                'phone', removed.phone,
+                'info', COALESCE(removed.info, ''),
+                'count', removed.row_num::text,
+                'content_category', COALESCE(bumped.content_category, 'F')
+            )
+            FROM removed
+            LEFT JOIN bumped ON TRUE
+        )
+        SELECT removed.school, removed.role, removed.seats, bumped.content_category
+        FROM removed
+        LEFT JOIN bumped ON TRUE
         """,
-        (announcement_id, user_id)
+        (member.id, announcement_id, json.dumps(payload)),
+        name="signup.withdraw"
     )
-    return row is not None
+    if row:
+        wake_outbox()
+    return row
+
 
 # ─────────────────────────────────────────────────────────────
 # Modals
@@ -104,6 +243,7 @@ class AnnouncementContentModal(discord.ui.Modal, title="Announcement Content"):
                 self.reactable,
             )
         )
+        interaction.client.deadlines.wake()
 
         await interaction.response.send_message(
             f"✅ Announcement created: `{self.aid}`",
@@ -152,7 +292,7 @@ class AnnouncementEditModal(discord.ui.Modal, title="Edit Announcement"):
         await execute(
             """
             UPDATE announcements
-            SET title=$1, content=$2, content_category=$3
+            SET title=$1, content=$2, content_category=$3, version = version + 1
             WHERE id=$4
             """,
             (
@@ -162,10 +302,11 @@ class AnnouncementEditModal(discord.ui.Modal, title="Edit Announcement"):
                 self.announcement_id,
             )
         )
+        interaction.client.deadlines.wake()
 
         row = await fetchone(
             """
-            SELECT message_id, reactable
+            SELECT message_id, reactable, end_at
             FROM announcements
             WHERE id=$1
             """,
@@ -173,41 +314,21 @@ class AnnouncementEditModal(discord.ui.Modal, title="Edit Announcement"):
         )
 
         if row:
-            message_id, reactable = row
+            message_id, reactable, end_at = row
 
             # Update public message
-            public_ch = interaction.client.get_channel(PUBLIC_CHANNEL_ID)
-            if not public_ch:
-                try:
-                    public_ch = await interaction.client.fetch_channel(PUBLIC_CHANNEL_ID)
-                except Exception:
-                    public_ch = None
+            msg = await get_message(interaction.client, PUBLIC_CHANNEL_ID, message_id)
 
-            if public_ch and message_id:
+            if msg:
                 try:
-                    msg = await public_ch.fetch_message(message_id)
-
                     header = f"**{self.title_input.value}**"
 
-                    row = await fetchone(
-                        """
-                        SELECT end_at
-                        FROM announcements
-                        WHERE id=$1
-                        """,
-                        (self.announcement_id,)
-                    )
-
-                    end_at = None
-
-                    if row:
-                        end_at = row["end_at"]
-
                     if reactable:
                         close_text = format_close_time(end_at)
                         header += f"\n{close_text}"
 
-                    await msg.edit(
+                    await edit_if_changed(
+                        msg,
                         content=f"{header}\n{self.content_input.value}"
                     )
 
@@ -216,7 +337,7 @@ class AnnouncementEditModal(discord.ui.Modal, title="Edit Announcement"):
 
             # Refresh dashboard (if reactable)
             if reactable:
-                await refresh_dashboard_for_announcement(
+                request_dashboard_refresh(
                     interaction.client,
                     self.announcement_id
                 )
@@ -244,12 +365,6 @@ class DriverModal(discord.ui.Modal, title="Driver Info"):
         await interaction.response.send_message("⏳ Registering...", ephemeral=True)
         
         school = get_school(interaction.user).strip()
-        
-        cat_record = await fetchone(
-            "SELECT content_category FROM announcements WHERE id=$1 AND reactable=$2",
-            (self.announcement_id, True)
-        )
-        content_category = cat_record[0] if cat_record else "F"
 
         try:
             if not str.isdigit(self.seats.value):
@@ -277,72 +392,14 @@ class DriverModal(discord.ui.Modal, title="Driver Info"):
                 await interaction.edit_original_response(content="❌ Additional information is limited to 130 characters.")
             return
 
-        row = await fetchone(
-            """
-            INSERT INTO ride_entries (
-                announcement_id, user_id, school, role, seats, updated_at, phone, info, row_num
-            )
-            SELECT
-                $1, $2, $3, 'driver', $4, NOW(), $5, $6,
-                COALESCE(MAX(row_num), 0) + 1
-            FROM ride_entries
-            WHERE announcement_id = $1
-              AND role = 'driver'
-              AND school = $3
-            RETURNING row_num
-            """,
-            (self.announcement_id, interaction.user.id, school, seats, phone, info)
+        # Queues the Google Sheets sync too; delivered in the background
+        await register_entry(
+            self.announcement_id, interaction.user, school, "driver", seats, phone, info
         )
-        
-        row_count = row["row_num"]
-
-        # Sync to Google Sheets and wait for response
-        google_receipt = await sync_to_sheets(
-                member=interaction.user,
-                announcement_id=self.announcement_id,
-                school=school,
-                role="driver",
-                seats=seats,
-                phone=phone,
-                info=info,
-                count=row_count,
-                content_category=content_category
-            )
-        
-        if google_receipt is None:
-            google_receipt = "Error: No response received from Google."
 
-        if "Error" in google_receipt or "⚠️" in google_receipt:
-            await interaction.edit_original_response(
-                content=f"❌ **Google Sheets Error:**\n`{google_receipt}`\n*Please try again or contact an admin.*"
-            )
-            return
-        
-        # Stores information
-        await execute(
-            """
-            INSERT INTO saved_info (
-                user_id,
-                role,
-                seats,
-                phone
-            )
-            VALUES ($1, 'driver', $2, $3)
-            ON CONFLICT (user_id)
-            DO UPDATE SET
-                role = 'driver',
-                seats = EXCLUDED.seats,
-                phone = EXCLUDED.phone
-            """,
-            (
-                interaction.user.id,
-                seats,
-                phone
-            )
-        )
         await interaction.edit_original_response(content="✅ You are now registered as a driver.")
 
-        await refresh_dashboard_for_announcement(interaction.client, self.announcement_id)
+        request_dashboard_refresh(interaction.client, self.announcement_id)
 
 class RiderModal(discord.ui.Modal, title = "Rider Info"):
     phone = discord.ui.TextInput(label="Phone Number (e.g. 9999999999)", required=True)
@@ -359,12 +416,6 @@ class RiderModal(discord.ui.Modal, title = "Rider Info"):
         await interaction.response.send_message("⏳ Registering...", ephemeral=True)
         
         school = get_school(interaction.user).strip()
-        
-        cat_record = await fetchone(
-            "SELECT content_category FROM announcements WHERE id=$1 AND reactable=$2",
-            (self.announcement_id, True)
-        )
-        content_category = cat_record[0] if cat_record else "F"
 
         try:
 
@@ -385,106 +436,50 @@ class RiderModal(discord.ui.Modal, title = "Rider Info"):
                 await interaction.edit_original_response(content="❌ Additional information is limited to 130 characters.")
             return
 
-        row = await fetchone(
-            """
-            INSERT INTO ride_entries (
-                announcement_id, user_id, school, role, seats, updated_at, phone, info, row_num
-            )
-            SELECT
-                $1, $2, $3, 'rider', NULL, NOW(), $4, $5,
-                COALESCE(MAX(row_num), 0) + 1
-            FROM ride_entries
-            WHERE announcement_id = $1
-              AND role = 'rider'
-              AND school = $3
-            RETURNING row_num;
-            """,
-            (self.announcement_id, interaction.user.id, school, phone, info)
-        )
-        
-        row_count = row["row_num"]
-        
-        # Sync to Google Sheets and wait for response
-        google_receipt =await sync_to_sheets(
-                member=interaction.user,
-                announcement_id=self.announcement_id,
-                school=school,
-                role="rider",
-                seats=None,
-                phone=phone,
-                info=info,
-                count=row_count,
-                content_category=content_category
-            )
-        
-        if google_receipt is None:
-            google_receipt = "Error: No response received from Google."
-
-        if "Error" in google_receipt or "⚠️" in google_receipt:
-            await interaction.edit_original_response(
-                content=f"❌ **Google Sheets Error:**\n`{google_receipt}`\n*Please try again or contact an admin.*"
-            )
-            return
-
-        await execute(
-            """
-            INSERT INTO saved_info (
-                user_id,
-                role,
-                seats,
-                phone
-            )
-            VALUES ($1, 'rider', NULL, $2)
-            ON CONFLICT (user_id)
-            DO UPDATE SET
-                role = 'rider',
-                seats = COALESCE(EXCLUDED.seats, saved_info.seats),
-                phone = COALESCE(EXCLUDED.phone, saved_info.phone)
-            """,
-            (
-                interaction.user.id,
-                phone
-            )
+        # Queues the Google Sheets sync too; delivered in the background
+        await register_entry(
+            self.announcement_id, interaction.user, school, "rider", None, phone, info
         )
 
         await interaction.edit_original_response(content="✅ You are now registered as a rider.")
 
-        await refresh_dashboard_for_announcement(interaction.client, self.announcement_id)
+        request_dashboard_refresh(interaction.client, self.announcement_id)
         
 # ─────────────────────────────────────────────────────────────
-# Ride View (Public Buttons)
+# Ride Buttons (Public Buttons)
+# Resolved from their custom id template at click time, so no
+# per-announcement view has to be registered on startup
 # ─────────────────────────────────────────────────────────────
+RIDE_BUTTONS = {
+    "request": ("Request Ride", discord.ButtonStyle.primary),
+    "driver": ("I'm a Driver", discord.ButtonStyle.success),
+    "withdraw": ("Withdraw", discord.ButtonStyle.danger),
+}
 
-class RideView(discord.ui.View):
-    def __init__(self, announcement_id, is_closed: bool):
-        super().__init__(timeout=None)
-        self.announcement_id = announcement_id
 
-        if not is_closed:
-            request = discord.ui.Button(
-                label="Request Ride",
-                style=discord.ButtonStyle.primary,
-                custom_id=f"ride:request:{announcement_id}"
+class RideButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"ride:(?P<action>request|driver|withdraw):(?P<id>[0-9a-fA-F-]{36})",
+):
+    def __init__(self, action, announcement_id):
+        label, style = RIDE_BUTTONS[action]
+        super().__init__(
+            discord.ui.Button(
+                label=label,
+                style=style,
+                custom_id=f"ride:{action}:{announcement_id}"
             )
-            request.callback = self.request_callback
-            self.add_item(request)
-
-        driver = discord.ui.Button(
-            label="I'm a Driver",
-            style=discord.ButtonStyle.success,
-            custom_id=f"ride:driver:{announcement_id}"
         )
-        driver.callback = self.driver_callback
+        self.action = action
+        self.announcement_id = announcement_id
 
-        withdraw = discord.ui.Button(
-            label="Withdraw",
-            style=discord.ButtonStyle.danger,
-            custom_id=f"ride:withdraw:{announcement_id}"
-        )
-        withdraw.callback = self.withdraw_callback
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["action"], uuid.UUID(match["id"]))
 
-        self.add_item(driver)
-        self.add_item(withdraw)
+    async def callback(self, interaction: discord.Interaction):
+        handler = getattr(self, f"{self.action}_callback")
+        await handler(interaction)
 
     # ──────────────── Callbacks ────────────────
 
@@ -497,27 +492,15 @@ class RideView(discord.ui.View):
             )
             return
 
-        reg = await is_registered(self.announcement_id, interaction.user.id)
-        if reg:
+        state = await load_signup_state(self.announcement_id, interaction.user.id)
+        if state["registered"]:
             await interaction.response.send_message(
                 "⚠️ You are already registered. Please withdraw before switching roles.",
                 ephemeral=True
             )
             return
 
-        saved = await fetchone(
-        """
-        SELECT phone
-        FROM saved_info
-        WHERE user_id=$1
-        """,
-        (interaction.user.id,)
-        )
-
-        default_number = None
-
-        if saved:
-            default_number = saved["phone"]
+        default_number = state["phone"]
 
         await interaction.response.send_modal(
             RiderModal(self.announcement_id, default_number)
@@ -533,29 +516,16 @@ class RideView(discord.ui.View):
             )
             return
 
-        reg = await is_registered(self.announcement_id, interaction.user.id)
-        if reg:
+        state = await load_signup_state(self.announcement_id, interaction.user.id)
+        if state["registered"]:
             await interaction.response.send_message(
                 "⚠️ You are already registered. Please withdraw before switching roles.",
                 ephemeral=True
             )
             return
 
-        saved = await fetchone(
-        """
-        SELECT seats, phone
-        FROM saved_info
-        WHERE user_id=$1
-        """,
-        (interaction.user.id,)
-        )
-
-        default_seats = None
-        default_number = None
-
-        if saved:
-            default_seats = saved["seats"]
-            default_number = saved["phone"]
+        default_seats = state["seats"]
+        default_number = state["phone"]
 
         await interaction.response.send_modal(
             DriverModal(self.announcement_id, default_seats, default_number)
@@ -565,62 +535,25 @@ class RideView(discord.ui.View):
         # Immediate loading state in ephemeral message
         await interaction.response.send_message("⏳ Withdrawing...", ephemeral=True)
 
-        cat_record = await fetchone(
-            "SELECT content_category FROM announcements WHERE id=$1",
-            (self.announcement_id,)
-        )
-        content_category = cat_record[0] if cat_record else "F"
-
         try:
-            entry = await fetchone(
-                """
-                DELETE FROM ride_entries
-                WHERE user_id=$1 AND announcement_id=$2
-                RETURNING school, role, seats, phone, info, row_num
-                """,
-                (interaction.user.id, self.announcement_id)
-            )
+            entry = await withdraw_entry(self.announcement_id, interaction.user)
         
             if not entry:
                 await interaction.edit_original_response(content="ℹ️ You are not registered for this announcement.")
                 return
 
-            school, role, seats, phone, info, user_count = entry
-            
-            # Wait for Google Sheets response before confirming withdrawal to user
-            google_receipt = await remove_from_sheets(
-                interaction.user, 
-                self.announcement_id, 
-                school, 
-                role, 
-                seats, 
-                phone, 
-                info, 
-                user_count, 
-                content_category
-            )
-
-            if google_receipt is None:
-                google_receipt = "Error: No response received from Google."
-
-            if "Error" in google_receipt or "⚠️" in google_receipt:
-                await interaction.edit_original_response(
-                    content=f"❌ **Google Sheets Error:**\n`{google_receipt}`\n*Your withdrawal was processed locally but failed to sync with Google Sheets. Please contact an admin to resolve this.*"
-                )
-                return
+            school, role, seats, content_category = entry
+            content_category = content_category or "F"
 
             # Edit ephemeral response to confirm successful withdrawal
             await interaction.edit_original_response(content="✅ You have successfully withdrawn and been removed from the ride list.")
-            await refresh_dashboard_for_announcement(interaction.client, self.announcement_id)
+            request_dashboard_refresh(interaction.client, self.announcement_id)
 
             WITHDRAW_CHANNEL_ID = int(os.getenv("WITHDRAW_CHANNEL_ID"))
-            withdraw_channel = interaction.client.get_channel(WITHDRAW_CHANNEL_ID)
+            withdraw_channel = await get_channel(interaction.client, WITHDRAW_CHANNEL_ID)
 
             if withdraw_channel is None:
-                try:
-                    withdraw_channel = await interaction.client.fetch_channel(WITHDRAW_CHANNEL_ID)
-                except Exception:
-                    print("Withdraw channel error.")
+                print("Withdraw channel error.")
 
             if content_category == "F":
                 ride_type = "Friday PM"
@@ -639,3 +572,19 @@ class RideView(discord.ui.View):
         except Exception as e:
             print(f"Error during withdrawal: {e}")
             await interaction.edit_original_response(content="⚠️ Something went wrong while withdrawing. Please try again.")
+
+
+# ─────────────────────────────────────────────────────────────
+# Ride View
+# Attached to public announcements; the buttons dispatch themselves
+# ─────────────────────────────────────────────────────────────
+class RideView(discord.ui.View):
+    def __init__(self, announcement_id, is_closed: bool):
+        super().__init__(timeout=None)
+        self.announcement_id = announcement_id
+
+        if not is_closed:
+            self.add_item(RideButton("request", announcement_id))
+
+        self.add_item(RideButton("driver", announcement_id))
+        self.add_item(RideButton("withdraw", announcement_id))